@@ -0,0 +1,161 @@
+"""Планы запросов лент до и после составных индексов posts 0025.
+
+Скрипт создает временную SQLite-базу, применяет миграции до
+0024_timelineentry, заполняет ее постами и подписками, выводит
+EXPLAIN QUERY PLAN и время запросов лент, затем применяет
+0025_feed_indexes и повторяет замеры.
+
+Запуск из корня репозитория:
+    python benchmarks/feed_indexes.py --posts 500000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+BEFORE = '0024_timelineentry'
+AFTER = '0025_feed_indexes'
+REPEAT = 20
+
+
+def setup_django(db_name):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_name
+    django.setup()
+
+
+def seed(posts, users, groups, follows):
+    from django.db import connection, transaction
+
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, '
+            'date_joined) VALUES (%s, 0, %s, %s, %s, %s, 0, 1, %s)',
+            [('!', f'user{i}', 'Имя', 'Фамилия', '', start)
+             for i in range(users)])
+        cursor.executemany(
+            'INSERT INTO posts_group (title, slug, description) '
+            'VALUES (%s, %s, %s)',
+            [(f'Группа {i}', f'group-{i}', '') for i in range(groups)])
+        batch = []
+        for i in range(posts):
+            group = random.randint(1, groups) if random.random() < .6 else None
+            batch.append((
+                f'Пост {i}', start + timedelta(seconds=i * 7),
+                random.randint(1, users), group, ''))
+            if len(batch) == 10000:
+                cursor.executemany(
+                    'INSERT INTO posts_post (text, pub_date, author_id, '
+                    'group_id, image) VALUES (%s, %s, %s, %s, %s)', batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                'INSERT INTO posts_post (text, pub_date, author_id, '
+                'group_id, image) VALUES (%s, %s, %s, %s, %s)', batch)
+        pairs = set()
+        while len(pairs) < follows:
+            user, author = random.sample(range(1, users + 1), 2)
+            pairs.add((user, author))
+        cursor.executemany(
+            'INSERT INTO posts_follow (user_id, author_id) VALUES (%s, %s)',
+            list(pairs))
+        cursor.execute('ANALYZE')
+
+
+def later_fields():
+    """Поля Post из миграций после BEFORE: их колонок в замеряемой
+    схеме нет, поэтому запросы их не выбирают."""
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+    from posts.models import Post
+
+    state = MigrationExecutor(connection).loader.project_state(
+        ('posts', BEFORE))
+    before = {field.name for field in state.apps.get_model(
+        'posts', 'Post')._meta.concrete_fields}
+    return [field.name for field in Post._meta.concrete_fields
+            if field.name not in before]
+
+
+def queries():
+    from core.paginators import CursorPaginator
+    from posts import feeds
+    from posts.models import Follow, Group, Post, User
+
+    later = later_fields()
+    author = User.objects.get(pk=1)
+    group = Group.objects.get(pk=1)
+    deep = Post.objects.defer(*later).order_by(
+        '-pub_date', '-pk')[Post.objects.count() // 2]
+
+    def feed(posts):
+        return posts.defer(*later)
+
+    def page(posts):
+        paginator = CursorPaginator(feed(posts), 10)
+        cursor = paginator.encode_cursor(deep)
+        values = paginator.decode_cursor(cursor)
+        return paginator.object_list.filter(paginator._seek(values))[:11]
+
+    return {
+        'index, page 1': feed(feeds.index_feed())
+        .order_by('-pub_date', '-pk')[:11],
+        'index, deep cursor': page(feeds.index_feed()),
+        'group, page 1': feed(feeds.group_feed(group))
+        .order_by('-pub_date', '-pk')[:11],
+        'group, deep cursor': page(feeds.group_feed(group)),
+        'profile, page 1': feed(feeds.profile_feed(author))
+        .order_by('-pub_date', '-pk')[:11],
+        'follow get_or_create lookup': Follow.objects.filter(
+            user_id=1, author_id=2),
+    }
+
+
+def report(title):
+    print(f'\n=== {title} ===')
+    for name, queryset in queries().items():
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            list(queryset.all())
+        elapsed = (time.perf_counter() - started) / REPEAT * 1000
+        print(f'\n{name}: {elapsed:.2f} ms')
+        for line in queryset.explain().splitlines():
+            print(f'    {line}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--follows', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'benchmark.sqlite3'))
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('migrate', 'posts', BEFORE, verbosity=0)
+        seed(args.posts, args.users, args.groups, args.follows)
+        report(f'before {AFTER}')
+        call_command('migrate', 'posts', AFTER, verbosity=0)
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        report(f'after {AFTER}')
+
+
+if __name__ == '__main__':
+    main()
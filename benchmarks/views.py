@@ -0,0 +1,193 @@
+"""Нагрузочный замер страниц лент через тестовый клиент Django.
+
+Скрипт создает временную SQLite-базу, заполняет ее командой
+seed_data, затем запрашивает страницы index, group_posts, profile,
+post_detail и follow_index и выводит для каждой перцентили времени
+ответа и число SQL-запросов. Результат сравнивается с сохраненным
+базовым замером (baseline.json рядом со скриптом); рост p50 больше
+чем на --tolerance или рост числа запросов считается регрессией, и
+скрипт завершается с кодом 1.
+
+Время ответа зависит от машины, поэтому базовый замер нужно
+пересохранять (--save-baseline) на той же машине, где идет сравнение.
+С --cold кеш очищается перед каждым запросом и замеряется путь до
+базы данных. Замер идет с DEBUG = False, как на рабочем сервере.
+
+Запуск из корня репозитория:
+    python benchmarks/views.py --posts 100000 --requests 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'baseline.json')
+PERCENTILES = (50, 90, 99)
+WARMUP = 5
+
+
+def setup_django(db_name):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = db_name
+    settings.DEBUG = False
+    django.setup()
+
+
+def percentile(values, percent):
+    """Перцентиль percent отсортированного списка values."""
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def scenarios():
+    """Страницы для замера: {название: (url, пользователь или None)}.
+
+    Берутся самые нагруженные объекты: самая большая группа, самый
+    активный автор, самый комментируемый пост и подписчик с
+    наибольшим числом подписок.
+    """
+    from django.db.models import Count
+    from django.urls import reverse
+
+    from posts.models import Comment, Follow, Group, Post
+
+    group = Group.objects.annotate(total=Count('posts')).latest('total')
+    author = (Post.objects.values('author__username').order_by()
+              .annotate(total=Count('pk')).latest('total'))
+    post = (Comment.objects.values('post').order_by()
+            .annotate(total=Count('pk')).latest('total'))
+    follower = (Follow.objects.values('user').order_by()
+                .annotate(total=Count('pk')).latest('total'))
+    return {
+        'index': (reverse('posts:index'), None),
+        'index, page 50': (reverse('posts:index') + '?page=50', None),
+        'group_posts': (
+            reverse('posts:allrecord', args=[group.slug]), None),
+        'profile': (
+            reverse('posts:profile', args=[author['author__username']]),
+            None),
+        'post_detail': (
+            reverse('posts:post_detail', args=[post['post']]), None),
+        'follow_index': (reverse('posts:follow_index'), follower['user']),
+    }
+
+
+def measure(url, user_id, requests, cold):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    if user_id is not None:
+        from posts.models import User
+        client.force_login(User.objects.get(pk=user_id))
+    timings = []
+    queries = []
+    for attempt in range(WARMUP + requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, (url, response.status_code)
+        if attempt >= WARMUP:
+            timings.append(elapsed)
+            queries.append(len(captured))
+    timings.sort()
+    result = {f'p{p}': round(percentile(timings, p), 2)
+              for p in PERCENTILES}
+    result['max'] = round(timings[-1], 2)
+    result['queries'] = max(queries)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Печатает отличия от baseline и возвращает список регрессий."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = (result['p50'] - base['p50']) / base['p50'] * 100
+        print(f'{name}: p50 {base["p50"]} -> {result["p50"]} ms '
+              f'({change:+.0f}%), queries {base["queries"]} -> '
+              f'{result["queries"]}')
+        if change > tolerance * 100:
+            regressions.append(f'{name}: p50 {change:+.0f}%')
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: queries {base["queries"]} -> {result["queries"]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--comments', type=int, default=100000)
+    parser.add_argument('--follows', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--cold', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'benchmark.sqlite3'))
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        call_command('migrate', verbosity=0)
+        started = time.perf_counter()
+        call_command(
+            'seed_data', users=args.users, groups=args.groups,
+            posts=args.posts, comments=args.comments,
+            follows=args.follows, stdout=sys.stderr)
+        print(f'seed_data: {time.perf_counter() - started:.1f} s',
+              file=sys.stderr)
+
+        mode = 'cold' if args.cold else 'warm'
+        results = {}
+        print(f'\n=== {mode} cache, {args.requests} requests ===')
+        print(f'{"view":<16}' + ''.join(
+            f'{key:>9}' for key in ('p50', 'p90', 'p99', 'max', 'queries')))
+        for name, (url, user_id) in scenarios().items():
+            result = measure(url, user_id, args.requests, args.cold)
+            results[f'{name} ({mode})'] = result
+            print(f'{name:<16}' + ''.join(
+                f'{value:>9}' for value in result.values()))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'\nbaseline saved to {args.baseline}')
+        return
+    print('\n=== baseline ===')
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print('\nregressions:\n  ' + '\n  '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
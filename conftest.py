@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings):
+    """Настройки всех тестов, как у manage.py test (core.testing)."""
+    from core.testing import TEST_SETTINGS
+
+    for name, value in TEST_SETTINGS.items():
+        setattr(settings, name, value)
@@ -0,0 +1,36 @@
+"""Компактные JSON-представления постов и страниц лент."""
+
+
+def serialize_author(user):
+    return {'username': user.username, 'name': user.get_full_name()}
+
+
+def serialize_group(group):
+    if group is None:
+        return None
+    return {'slug': group.slug, 'title': group.title}
+
+
+def serialize_post(post):
+    thumbnail = getattr(post, 'thumbnail', None)
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': serialize_author(post.author),
+        'group': serialize_group(post.group),
+        'image': post.image.url if post.image else None,
+        'thumbnail': thumbnail.src if thumbnail else None,
+        'comment_count': post.comment_count,
+    }
+
+
+def serialize_page(request, page):
+    """Посты страницы и ссылки на соседние страницы по курсорам."""
+    return {
+        'results': [serialize_post(post) for post in page],
+        'next': (f'{request.path}?after={page.next_cursor}'
+                 if page.has_next() else None),
+        'previous': (f'{request.path}?before={page.previous_cursor}'
+                     if page.has_previous() else None),
+    }
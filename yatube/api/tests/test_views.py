@@ -0,0 +1,98 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from api.views import PAGE_SIZE
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='testslug', description='')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(PAGE_SIZE + 3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_return_json_pages(self):
+        """Ленты отдают страницы постов и ссылку на следующую."""
+        urls = {
+            reverse('api:index'): self.client,
+            reverse('api:group_posts', args=[self.group.slug]): self.client,
+            reverse('api:profile', args=[self.author.username]):
+                self.client,
+            reverse('api:follow_index'): self.reader_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(len(data['results']), PAGE_SIZE)
+                self.assertEqual(
+                    data['results'][0]['id'], self.posts[-1].pk)
+                self.assertEqual(
+                    data['results'][0]['group']['slug'], self.group.slug)
+                self.assertIsNone(data['previous'])
+                rest = client.get(data['next']).json()
+                self.assertEqual(
+                    [post['id'] for post in rest['results']],
+                    [post.pk for post in self.posts[2::-1]])
+                self.assertIsNone(rest['next'])
+
+    def test_follow_requires_login(self):
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_not_modified_until_feed_changes(self):
+        """Неизменившаяся лента отдается ответом 304."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_skips_feed_query(self):
+        """Для ответа 304 страница ленты не выбирается."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_post_detail_etag_follows_comments(self):
+        """ETag поста меняется с новым комментарием."""
+        post = self.posts[0]
+        url = reverse('api:post_detail', args=[post.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['text'], post.text)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(author=self.reader, post=post, text='Да')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            HTTPStatus.OK)
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('api:post_detail', args=[0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
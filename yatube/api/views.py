@@ -0,0 +1,96 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from core.paginators import CursorPaginator
+from posts import counters, feed_cache, feeds, thumbnails
+from posts.models import Group, Post, User
+from .serializers import serialize_page, serialize_post
+
+"""Количество постов на странице."""
+PAGE_SIZE = 10
+
+
+def newest_pub_date(posts):
+    """Дата самого нового поста; читается из индекса по pub_date."""
+    return (posts.order_by('-pub_date')
+            .values_list('pub_date', flat=True).first())
+
+
+def conditional_json(request, etag, build):
+    """Возвращает 304, если у клиента актуальная версия (If-None-Match),
+    иначе JSON из build() с заголовком ETag. Без etag - просто JSON.
+    """
+    if etag is None:
+        return JsonResponse(build())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    response = JsonResponse(build())
+    response['ETag'] = etag
+    return response
+
+
+def get_page(request, posts):
+    """Страница posts по курсору ?after=/?before= без COUNT(*)."""
+    paginator = CursorPaginator(posts, PAGE_SIZE)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        page = paginator.get_cursor_page(after=after, before=before)
+    else:
+        page = paginator.get_first_page()
+    thumbnails.attach(page.object_list)
+    return page
+
+
+def feed_response(request, posts, *feed_keys):
+    etag = feed_cache.etag(request, feed_keys, newest_pub_date(posts))
+    return conditional_json(
+        request, etag,
+        lambda: serialize_page(request, get_page(request, posts)))
+
+
+def index(request):
+    """Главная лента."""
+    return feed_response(request, feeds.index_feed(), counters.INDEX_KEY)
+
+
+def group_posts(request, slug):
+    """Лента сообщества."""
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request, feeds.group_feed(group), counters.group_key(group.pk))
+
+
+def profile(request, username):
+    """Лента автора."""
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request, feeds.profile_feed(author), counters.author_key(author.pk))
+
+
+def follow_index(request):
+    """Лента подписок текущего пользователя."""
+    user = request.user
+    if not user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется авторизация.'}, status=401)
+    response = feed_response(
+        request, feeds.follow_feed(user),
+        feed_cache.follow(user.pk), counters.INDEX_KEY)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def post_detail(request, post_id):
+    """Пост."""
+    etag = feed_cache.etag(request, [feed_cache.post(post_id)])
+
+    def build():
+        post = get_object_or_404(
+            feeds.feed(Post.objects.all()), pk=post_id)
+        thumbnails.attach([post])
+        return serialize_post(post)
+
+    return conditional_json(request, etag, build)
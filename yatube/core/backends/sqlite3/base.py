@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, в котором транзакции сразу берут блокировку записи.
+
+    Транзакция, начатая простым BEGIN, берет блокировку записи только
+    на первом изменении. Если к этому времени пишет другое
+    подключение, SQLite не ждет busy timeout и сразу возвращает
+    "database is locked". BEGIN IMMEDIATE ждет блокировку в начале
+    транзакции, пока она не освободится.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
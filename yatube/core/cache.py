@@ -0,0 +1,109 @@
+"""Общие функции кеша.
+
+make_key подключается в settings.CACHES как KEY_FUNCTION: ключи
+получают пространство имен KEY_PREFIX, а слишком длинные ключи
+заменяются хешем, чтобы их принимал любой бэкенд.
+
+get_or_set защищает от лавины запросов (cache stampede): значение
+пересчитывает только один процесс, взявший блокировку, остальные
+получают устаревшее значение или ждут нового.
+
+Бэкенды LocMemCache, FileBasedCache и DatabaseCache этого модуля
+считают попадания и промахи для метрик запроса (core.metrics).
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core import metrics
+
+MAX_KEY_LENGTH = 200
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 2
+WAIT_STEP = 0.05
+
+_missing = object()
+
+
+def make_key(key, key_prefix, version):
+    full_key = f'{key_prefix}:{version}:{key}'
+    if len(full_key) <= MAX_KEY_LENGTH:
+        return full_key
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return f'{key_prefix}:{version}:hash:{digest}'
+
+
+def get_or_set(key, default, timeout, lock_timeout=LOCK_TIMEOUT):
+    """Возвращает значение key, вычисляя его функцией default.
+
+    Значение хранится вместе со сроком свежести timeout и живет в
+    кеше вдвое дольше. После истечения срока свежести один процесс
+    пересчитывает значение, остальные получают прежнее.
+    """
+    cached = cache.get(key, _missing)
+    if cached is not _missing:
+        value, fresh_until = cached
+        if fresh_until > time.time() or not _lock(key, lock_timeout):
+            return value
+        return _refresh(key, default, timeout)
+    if _lock(key, lock_timeout):
+        return _refresh(key, default, timeout)
+    waited = 0
+    while waited < WAIT_TIMEOUT:
+        time.sleep(WAIT_STEP)
+        waited += WAIT_STEP
+        cached = cache.get(key, _missing)
+        if cached is not _missing:
+            return cached[0]
+    return default()
+
+
+def _lock(key, lock_timeout):
+    return cache.add(f'{key}:lock', True, lock_timeout)
+
+
+def _refresh(key, default, timeout):
+    try:
+        value = default()
+        cache.set(key, (value, time.time() + timeout), timeout * 2)
+    finally:
+        cache.delete(f'{key}:lock')
+    return value
+
+
+class CountingGetMixin:
+    """Считает попадания в get; get_many бэкенда вызывает get."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+
+class CountingGetManyMixin:
+    """Считает попадания в get_many; get бэкенда вызывает get_many."""
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class CountingLocMemCache(CountingGetMixin, LocMemCache):
+    pass
+
+
+class CountingFileBasedCache(CountingGetMixin, FileBasedCache):
+    pass
+
+
+class CountingDatabaseCache(CountingGetManyMixin, DatabaseCache):
+    pass
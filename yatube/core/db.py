@@ -0,0 +1,78 @@
+"""Настройка подключений к базе и чтение с реплик.
+
+tune_sqlite выполняет settings.SQLITE_PRAGMAS на каждом новом
+подключении к SQLite: журнал WAL позволяет читать во время записи, а
+mmap и кеш страниц уменьшают число чтений с диска.
+
+ReplicaRouter отправляет чтения view, обернутых в read_from_replica,
+на случайную реплику из settings.REPLICA_DATABASES. Записи, чтения
+внутри транзакций и все остальные чтения идут в основную базу
+default.
+
+Реплики отстают от основной базы не больше чем на
+REPLICA_PIN_SECONDS секунд. Поэтому после записи пользователь на это
+время закрепляется за default и видит свои посты и комментарии:
+StickyPrimaryMiddleware ставит ему cookie после каждого POST и
+вызывает pin_primary на запросах с этой cookie. Чтения с реплики
+внутри этого окна не кешируются (posts.feed_cache).
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_state = threading.local()
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Запросы идут мимо курсора Django, чтобы не попадать в метрики
+    # и списки запросов тестов.
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def pin_primary(pinned=True):
+    """Читать до конца запроса только из основной базы."""
+    _state.pinned = pinned
+
+
+def reads_from_replica():
+    """Идут ли чтения текущего запроса в реплики."""
+    # Внутри транзакции чтения видят ее же записи только в default.
+    return (getattr(_state, 'replica', False)
+            and not getattr(_state, 'pinned', False)
+            and bool(settings.REPLICA_DATABASES)
+            and not connections['default'].in_atomic_block)
+
+
+def read_from_replica(view):
+    """Декоратор view, который читает только из реплик."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        _state.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = False
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return random.choice(settings.REPLICA_DATABASES)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
@@ -0,0 +1,184 @@
+"""Метрики запросов в формате Prometheus.
+
+MetricsMiddleware замеряет для каждого запроса время ответа, число и
+время SQL-запросов, время рендеринга шаблонов и попадания в кеш и
+складывает их в гистограммы и счетчики с меткой view - именем
+URL-шаблона ('posts:index', 'posts:post_detail', ...). Метрики
+хранятся в памяти процесса: при нескольких воркерах каждый отдает
+свои, а суммирует их Prometheus.
+
+Время шаблонов считает бэкенд TimedDjangoTemplates, попадания в кеш -
+бэкенды кеша из core.cache. Снаружи замера (в командах, фоновых
+потоках) они ничего не записывают.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.template.backends.django import DjangoTemplates, Template
+
+UNRESOLVED = '<unresolved>'
+
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами, как в Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """Пары (граница корзины, накопленное количество)."""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+# Метрики: имя -> (тип, описание, корзины гистограммы).
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа на запрос.', TIME_BUCKETS),
+    'yatube_db_queries': (
+        'histogram', 'Число SQL-запросов за запрос.', COUNT_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов за запрос.', TIME_BUCKETS),
+    'yatube_template_render_seconds': (
+        'histogram', 'Время рендеринга шаблонов за запрос.', TIME_BUCKETS),
+    'yatube_cache_hits_total': (
+        'counter', 'Попадания в кеш.', None),
+    'yatube_cache_misses_total': (
+        'counter', 'Промахи кеша.', None),
+}
+
+
+class Registry:
+    """Метрики процесса с меткой view."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = defaultdict(dict)
+        self.counters = defaultdict(lambda: defaultdict(int))
+
+    def record(self, view, stats):
+        with self.lock:
+            for name, value in stats.items():
+                kind, _, buckets = METRICS[name]
+                if kind == 'counter':
+                    self.counters[name][view] += value
+                    continue
+                histogram = self.histograms[name].get(view)
+                if histogram is None:
+                    histogram = self.histograms[name][view] = Histogram(
+                        buckets)
+                histogram.observe(value)
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (kind, description, _) in METRICS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for view, value in sorted(self.counters[name].items()):
+                        lines.append(f'{name}{{view="{view}"}} {value}')
+                    continue
+                for view, histogram in sorted(self.histograms[name].items()):
+                    for bound, total in histogram.samples():
+                        lines.append(
+                            f'{name}_bucket{{view="{view}",le="{bound}"}} '
+                            f'{total}')
+                    lines.append(
+                        f'{name}_sum{{view="{view}"}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{view="{view}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+_current = threading.local()
+
+
+class RequestStats:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.template_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def start():
+    _current.stats = RequestStats()
+    return _current.stats
+
+
+def stop():
+    _current.stats = None
+
+
+def current():
+    """Замеры текущего запроса или None вне MetricsMiddleware."""
+    return getattr(_current, 'stats', None)
+
+
+def record_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class TimedTemplate(Template):
+    """Шаблон, который добавляет время рендеринга к замерам запроса."""
+
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates с замером времени рендеринга.
+
+    Вложенные шаблоны (include, extends) загружает сам Engine, поэтому
+    время считается один раз - для шаблона, отрисованного view.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self)
@@ -0,0 +1,112 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import db, metrics, queries
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class MetricsMiddleware:
+    """Записывает метрики запроса в core.metrics.registry.
+
+    Стоит первым в MIDDLEWARE, чтобы замер включал остальные
+    middleware. Метка view - имя URL-шаблона, для ненайденных
+    адресов - '<unresolved>'.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else metrics.UNRESOLVED
+        metrics.registry.record(view, {
+            'yatube_request_duration_seconds':
+                time.perf_counter() - started,
+            'yatube_db_queries': stats.queries,
+            'yatube_db_duration_seconds': stats.db_time,
+            'yatube_template_render_seconds': stats.template_time,
+            'yatube_cache_hits_total': stats.cache_hits,
+            'yatube_cache_misses_total': stats.cache_misses,
+        })
+        return response
+
+
+class QueryInspectionMiddleware:
+    """Пишет в лог N+1, медленные запросы и превышения бюджета.
+
+    Включается настройкой QUERY_INSPECTION: поиск мест повторов
+    обходит стек, поэтому на рабочем сервере он выключен.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with queries.QueryInspector() as inspector:
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else metrics.UNRESOLVED
+        budget = queries.budget(view)
+        if budget is not None and len(inspector) > budget:
+            logger.warning(
+                '%s %s: %d запросов при бюджете %d',
+                view, request.get_full_path(), len(inspector), budget)
+        report = inspector.report()
+        if report:
+            logger.warning(
+                '%s %s:\n%s', view, request.get_full_path(), report)
+        return response
+
+
+class StickyPrimaryMiddleware:
+    """Закрепляет пользователя за основной базой после записи.
+
+    После запроса с небезопасным методом (POST и т. п.) ставит cookie
+    со временем окончания закрепления. Пока оно не прошло, чтения
+    view с read_from_replica идут в default, а не в реплики.
+    """
+    COOKIE = 'yatube_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+        db.pin_primary(self.pinned_until(request) > time.time())
+        try:
+            response = self.get_response(request)
+        finally:
+            db.pin_primary(False)
+        if request.method not in SAFE_METHODS:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                self.COOKIE, int(time.time() + seconds) + 1,
+                max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+    def pinned_until(self, request):
+        try:
+            return int(request.COOKIES.get(self.COOKIE, 0))
+        except ValueError:
+            return 0
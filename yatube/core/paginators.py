@@ -0,0 +1,327 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property, lazy
+
+
+class CursorPage(Page):
+    """Страница, полученная по курсору (keyset-пагинация).
+
+    Номер страницы при переходе по курсору неизвестен, поэтому
+    наличие соседних страниц определяется по выборке, а не по count.
+    У всех страниц пагинатора есть cache_token - часть ключа кеша,
+    которая определяет страницу по фактической выборке, а не по
+    параметрам запроса.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор с переходом по непрозрачным курсорам ?after=/?before=.
+
+    Ключ пагинации задается полями ordering (по умолчанию - порядок
+    object_list, заданный order_by, или (-pub_date, -pk)), поэтому
+    запрос любой страницы по курсору - это диапазонное чтение по
+    индексу без OFFSET и COUNT(*). Поля ключа могут быть аннотациями
+    object_list.
+    Нумерованные страницы (?page=N) по-прежнему поддерживаются.
+
+    Ключевые аргументы:
+    object_list -- QuerySet, который нужно разбить на страницы,
+    per_page -- количество записей на странице,
+    ordering -- поля ключа пагинации, последнее должно быть уникальным
+    в выборке
+    """
+    ordering = ('-pub_date', '-pk')
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, ordering=None, **kwargs):
+        if ordering is None and object_list.query.order_by:
+            ordering = object_list.query.order_by
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs)
+
+    def _fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _field_value(self, obj, name):
+        if name == 'pk':
+            return obj.pk
+        return getattr(obj, name)
+
+    @staticmethod
+    def _serialize(value):
+        # isoformat() сохраняет микросекунды, без них ключ будет неточным
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    def _to_python(self, name, value):
+        annotations = self.object_list.query.annotations
+        model = self.object_list.model
+        if name in annotations:
+            field = annotations[name].output_field
+        elif name == 'pk':
+            field = model._meta.pk
+        else:
+            field = model._meta.get_field(name)
+        return field.to_python(value)
+
+    def encode_cursor(self, obj):
+        """Возвращает курсор, указывающий на объект obj."""
+        values = [
+            self._field_value(obj, name) for name in self._fields()
+        ]
+        raw = json.dumps(values, default=self._serialize)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор, для некорректного значения возвращает None."""
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            values = json.loads(raw.decode())
+            fields = self._fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                return None
+            return [
+                self._to_python(name, value)
+                for name, value in zip(fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+
+    def _seek(self, values, reverse=False):
+        """Условие "строго после ключа values" в порядке ordering.
+
+        Нестрогая граница по первому полю дублирует условие, но
+        позволяет базе читать индекс диапазоном, а не через OR.
+        """
+        condition = Q()
+        bound = None
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            name = order.lstrip('-')
+            descending = order.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            if bound is None:
+                bound = Q(**{f'{name}__{lookup}e': value})
+            equal[name] = value
+        return bound & condition
+
+    def _reversed_ordering(self):
+        return [
+            order[1:] if order.startswith('-') else f'-{order}'
+            for order in self.ordering
+        ]
+
+    def get_cursor_page(self, after=None, before=None):
+        """Возвращает страницу по курсору.
+
+        Если курсор не передан или некорректен, возвращает первую
+        нумерованную страницу, как get_page() для неверного номера.
+        """
+        values = self.decode_cursor(after or before or '')
+        if values is None:
+            return self.get_page(1)
+        if after:
+            rows = list(
+                self.object_list.filter(self._seek(values))
+                [:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return self._cursor_page(
+                rows, has_more, True, self._cache_token('from', rows[:1]))
+        rows = list(
+            self.object_list.filter(self._seek(values, reverse=True))
+            .order_by(*self._reversed_ordering())[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._cursor_page(
+            rows, True, has_more, self._cache_token('to', rows[-1:]))
+
+    def get_first_page(self):
+        """Возвращает первую страницу без COUNT(*).
+
+        Наличие следующей страницы определяется по выборке, поэтому
+        номер страницы и ссылки на нумерованные страницы неизвестны.
+        """
+        rows = list(self.object_list[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        return self._cursor_page(
+            rows[:self.per_page], has_more, False, 'first')
+
+    def _cache_token(self, side, rows):
+        """Токен страницы курсора по записи на ее границе.
+
+        Страница после курсора определяется первой записью, страница
+        до курсора - последней, поэтому любые курсоры, ведущие к одной
+        и той же выборке, дают один токен.
+        """
+        if not rows:
+            return f'{side}=end'
+        return f'{side}={self.encode_cursor(rows[0])}'
+
+    def _cursor_page(self, object_list, has_next, has_previous, token):
+        page = CursorPage(object_list, self, has_next, has_previous)
+        page.cache_token = token
+        self._set_cursors(page)
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.cache_token = f'page={page.number}'
+        self._set_cursors(page)
+        page.page_window = self.get_page_window(page.number)
+        return page
+
+    def get_page_window(self, number, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг number с пропусками ELLIPSIS.
+
+        Вместо всех num_pages ссылок выводятся крайние страницы
+        и по on_each_side страниц с каждой стороны от текущей.
+        """
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2 + 1:
+            return list(self.page_range)
+        window = []
+        if number > on_each_side + on_ends + 1:
+            window += list(range(1, on_ends + 1)) + [self.ELLIPSIS]
+            start = number - on_each_side
+        else:
+            start = 1
+        if number < num_pages - on_each_side - on_ends:
+            end = number + on_each_side
+            tail = [self.ELLIPSIS] + list(
+                range(num_pages - on_ends + 1, num_pages + 1))
+        else:
+            end = num_pages
+            tail = []
+        return window + list(range(start, end + 1)) + tail
+
+    def _set_cursors(self, page):
+        """Добавляет странице курсоры соседних страниц.
+
+        Курсоры ленивые: записи страницы выбираются, только когда
+        курсор выводится, поэтому закешированная страница не
+        обращается к базе.
+        """
+        page.next_cursor = lazy(self._next_cursor, str)(page)
+        page.previous_cursor = lazy(self._previous_cursor, str)(page)
+
+    def _next_cursor(self, page):
+        if len(page) and page.has_next():
+            return self.encode_cursor(page[-1])
+        return ''
+
+    def _previous_cursor(self, page):
+        if len(page) and page.has_previous():
+            return self.encode_cursor(page[0])
+        return ''
+
+
+class CountedPaginator(CursorPaginator):
+    """Пагинатор, который берет общее количество записей из count.
+
+    Ключевые аргументы:
+    count -- количество записей или функция, которая его возвращает;
+    вызывается только когда нужен номер последней страницы
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        self._count = count
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if callable(self._count):
+            return self._count()
+        return self._count
+
+
+def estimate_count(model, using='default'):
+    """Оценка количества строк таблицы model без COUNT(*).
+
+    Берется из статистики PostgreSQL и MySQL, в SQLite - по
+    наибольшему rowid (чтение последней записи индекса). Если оценки
+    нет, возвращает None.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class '
+                       'WHERE relname = %s', [table]),
+        'mysql': ('SELECT table_rows FROM information_schema.tables '
+                  'WHERE table_schema = DATABASE() AND table_name = %s',
+                  [table]),
+        'sqlite': (
+            f'SELECT max(rowid) FROM {connection.ops.quote_name(table)}',
+            []),
+    }
+    if connection.vendor not in queries:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(*queries[connection.vendor])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списков админки без COUNT(*) по всей таблице.
+
+    Количество записей неотфильтрованного списка оценивается
+    estimate_count, если оценка больше COUNT_LIMIT. Записи
+    отфильтрованного списка считаются не дальше COUNT_LIMIT, поэтому
+    последние страницы большой выборки недоступны - ее нужно сузить.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+def get_page(request, object_list, per_page, count=None):
+    """Возвращает страницу object_list для запроса request.
+
+    Переход по курсорам ?after=/?before= имеет приоритет над
+    номером страницы ?page=. Если передан count, COUNT(*)
+    по object_list не выполняется.
+    """
+    if count is None:
+        paginator = CursorPaginator(object_list, per_page)
+    else:
+        paginator = CountedPaginator(object_list, per_page, count)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        return paginator.get_cursor_page(after=after, before=before)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,143 @@
+"""Поиск N+1 и медленных SQL-запросов.
+
+QueryInspector записывает запросы, выполненные внутри блока with, и
+группирует их по форме - тексту запроса без значений параметров.
+Форма, повторенная QUERY_REPEAT_THRESHOLD раз и больше, - вероятный
+N+1: запрос в цикле по объектам страницы. Для таких запросов
+запоминается место в коде и шаблоне, откуда пришел повтор.
+
+Бюджеты запросов view задаются в settings.QUERY_BUDGETS по имени
+URL-шаблона. Их проверяют тесты (core.testing.QueryBudgetMixin) и
+QueryInspectionMiddleware, который при settings.QUERY_INSPECTION
+пишет превышения бюджета, повторы и медленные запросы в лог.
+"""
+import os
+import re
+import sys
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+from core import cache
+
+Query = namedtuple('Query', ['sql', 'duration', 'location'])
+Repeat = namedtuple('Repeat', ['shape', 'count', 'location'])
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+_LISTS = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)')
+_SPACES = re.compile(r'\s+')
+# Модули и функции, которые сами перехватывают запросы: их кадры
+# стека не место запроса.
+_INSTRUMENTATION = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('metrics.py', 'queries.py')
+}
+_INSTRUMENTATION_CODE = {
+    cache.CountingGetMixin.get.__code__,
+    cache.CountingGetManyMixin.get_many.__code__,
+}
+
+
+def shape(sql):
+    """Текст запроса без значений: строки, числа и списки IN -> ?."""
+    sql = _LITERALS.sub('?', sql)
+    sql = _LISTS.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def location():
+    """Место в коде проекта и в шаблоне, откуда выполняется запрос."""
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and (code is None or template is None):
+        if (template is None
+                and frame.f_code is Node.render_annotated.__code__):
+            node = frame.f_locals['self']
+            origin = node.origin.template_name or node.origin.name
+            template = f'{origin}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (code is None and filename.startswith(settings.BASE_DIR)
+                and filename not in _INSTRUMENTATION
+                and frame.f_code not in _INSTRUMENTATION_CODE):
+            code = (f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                    f'{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return ', '.join(
+        part for part in (code, template and f'шаблон {template}') if part)
+
+
+class QueryInspector:
+    """Записывает SQL-запросы всех подключений внутри блока with."""
+
+    def __init__(self, threshold=None, slow=None):
+        self.threshold = threshold or settings.QUERY_REPEAT_THRESHOLD
+        self.slow_time = slow or settings.SLOW_QUERY_TIME
+        self.queries = []
+        self.shapes = Counter()
+        self.locations = {}
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(
+                connection.execute_wrapper(self.execute_wrapper))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            key = shape(sql)
+            self.shapes[key] += 1
+            where = None
+            # Место ищется только для повторов и медленных запросов:
+            # обход стека на каждый запрос заметно замедлил бы страницу.
+            if self.shapes[key] == self.threshold:
+                where = self.locations[key] = location()
+            elif duration >= self.slow_time:
+                where = location()
+            self.queries.append(Query(sql, duration, where))
+
+    def repeats(self):
+        """Вероятные N+1: формы запросов, повторенные threshold раз."""
+        return [
+            Repeat(key, count, self.locations[key])
+            for key, count in self.shapes.most_common()
+            if count >= self.threshold
+        ]
+
+    def slow(self):
+        return [
+            query for query in self.queries
+            if query.duration >= self.slow_time
+        ]
+
+    def report(self):
+        """Повторы и медленные запросы в виде текста для лога."""
+        lines = [
+            f'N+1: {repeat.count} x {repeat.shape} ({repeat.location})'
+            for repeat in self.repeats()
+        ]
+        lines.extend(
+            f'медленный запрос {query.duration * 1000:.0f} мс: '
+            f'{query.sql} ({query.location})'
+            for query in self.slow()
+        )
+        return '\n'.join(lines)
+
+
+def budget(view_name):
+    """Бюджет запросов view из settings.QUERY_BUDGETS или None."""
+    return settings.QUERY_BUDGETS.get(view_name)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.test import runner
+from django.test.utils import override_settings
+
+from core import queries
+
+# Кеш в базе добавил бы собственные запросы к каждой странице.
+LOCMEM_CACHE = override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+
+# Настройки всех тестов: миниатюры создаются сразу, чтобы фоновые
+# потоки не писали во временный MEDIA_ROOT после окончания теста.
+TEST_SETTINGS = {'THUMBNAIL_WORKERS': 0}
+
+# Отдельная база, которую тесты роутера (core.tests.test_db)
+# подключают как реплику.
+TEST_REPLICA = 'test_replica'
+
+
+class DiscoverRunner(runner.DiscoverRunner):
+    """Запуск manage.py test с TEST_SETTINGS и базой TEST_REPLICA."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(**TEST_SETTINGS)
+        self.test_settings.enable()
+        # Подключения django.db читают этот же словарь DATABASES.
+        settings.DATABASES.setdefault(
+            TEST_REPLICA, {**settings.DATABASES['default']})
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class QueryBudgetMixin:
+    """Проверки числа запросов для TestCase.
+
+    get_within_budget выполняет запрос тестовым клиентом и падает,
+    если view превысил свой бюджет из settings.QUERY_BUDGETS или
+    повторил одну форму запроса QUERY_REPEAT_THRESHOLD раз (N+1).
+    """
+
+    def get_within_budget(self, client, url, **extra):
+        with queries.QueryInspector() as inspector:
+            response = client.get(url, **extra)
+        view = response.resolver_match.view_name
+        budget = queries.budget(view)
+        self.assertIsNotNone(
+            budget, f'{view}: бюджет не задан в settings.QUERY_BUDGETS')
+        self.assertLessEqual(
+            len(inspector), budget,
+            f'{view} {url}: {len(inspector)} запросов при бюджете '
+            f'{budget}\n' + '\n'.join(query.sql for query in inspector.queries)
+        )
+        self.assertFalse(inspector.repeats(), inspector.report())
+        return response
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.cache import get_or_set, make_key
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_make_key_hashes_long_keys(self):
+        """Длинные ключи заменяются хешем в пространстве имен."""
+        self.assertEqual(make_key('feed', 'yatube', 1), 'yatube:1:feed')
+        long_key = make_key('x' * 300, 'yatube', 1)
+        self.assertTrue(long_key.startswith('yatube:1:hash:'))
+        self.assertLessEqual(len(long_key), 200)
+
+    def test_get_or_set_computes_once(self):
+        """Значение вычисляется один раз и берется из кеша."""
+        default = mock.Mock(return_value='value')
+        self.assertEqual(get_or_set('key', default, 60), 'value')
+        self.assertEqual(get_or_set('key', default, 60), 'value')
+        default.assert_called_once()
+
+    def test_get_or_set_serves_stale_while_locked(self):
+        """Пока значение пересчитывается, остальные получают прежнее."""
+        get_or_set('key', lambda: 'old', 60)
+        with mock.patch('core.cache.time') as mock_time:
+            mock_time.time.return_value = 10 ** 10
+            cache.add('key:lock', True)
+            default = mock.Mock(return_value='new')
+            self.assertEqual(get_or_set('key', default, 60), 'old')
+            default.assert_not_called()
+            cache.delete('key:lock')
+            self.assertEqual(get_or_set('key', default, 60), 'new')
@@ -0,0 +1,135 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db import ReplicaRouter, pin_primary, read_from_replica
+from core.middleware import StickyPrimaryMiddleware
+from core.testing import LOCMEM_CACHE, TEST_REPLICA
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64 * 1024)
+
+
+class ImmediateTransactionTests(TransactionTestCase):
+    def test_transactions_take_write_lock_at_start(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Post.objects.exists()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def db_for_read(self):
+        return self.router.db_for_read(Post)
+
+    def test_reads_from_replica_inside_decorated_view(self):
+        view = read_from_replica(lambda request: self.db_for_read())
+        self.assertEqual(view(None), 'replica1')
+        self.assertIsNone(self.db_for_read())
+
+    def test_pinned_reads_use_default(self):
+        view = read_from_replica(lambda request: self.db_for_read())
+        pin_primary()
+        try:
+            self.assertIsNone(view(None))
+        finally:
+            pin_primary(False)
+
+    def test_writes_use_default(self):
+        view = read_from_replica(
+            lambda request: self.router.db_for_write(Post))
+        self.assertEqual(view(None), 'default')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas_reads_from_default(self):
+        view = read_from_replica(lambda request: self.db_for_read())
+        self.assertIsNone(view(None))
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRouterTransactionTests(TestCase):
+    def test_reads_inside_transaction_use_default(self):
+        """TestCase выполняет каждый тест внутри транзакции."""
+        view = read_from_replica(
+            lambda request: ReplicaRouter().db_for_read(Post))
+        self.assertIsNone(view(None))
+
+
+@LOCMEM_CACHE
+@override_settings(REPLICA_DATABASES=[TEST_REPLICA])
+class StickyPrimaryTests(TransactionTestCase):
+    """Две базы SQLite: default и отстающая от нее реплика."""
+    databases = {'default', TEST_REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        User.objects.using(TEST_REPLICA).create(
+            pk=self.author.pk, username='author')
+        Post.objects.create(author=self.author, text='Пост в основной базе')
+        Post.objects.using(TEST_REPLICA).create(
+            author_id=self.author.pk, text='Пост на реплике')
+        self.client.force_login(self.author)
+
+    def index(self):
+        return self.client.get(reverse('posts:index')).content.decode()
+
+    def test_feeds_read_from_replica(self):
+        self.assertIn('Пост на реплике', self.index())
+
+    def test_author_reads_own_writes_from_primary(self):
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertIn(StickyPrimaryMiddleware.COOKIE, response.cookies)
+        page = self.index()
+        self.assertIn('Новый пост', page)
+        self.assertNotIn('Пост на реплике', page)
+
+    def test_pin_expires(self):
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.client.cookies[StickyPrimaryMiddleware.COOKIE] = int(
+            time.time()) - 1
+        self.assertIn('Пост на реплике', self.index())
+
+    def test_lagging_replica_render_is_not_cached(self):
+        """Страница, прочитанная с реплики в пределах ее отставания
+        от записи, не кешируется под новой версией ленты."""
+        Post.objects.create(author=self.author, text='Новый пост')
+        anonymous = self.client_class()
+        response = anonymous.get(reverse('posts:index'))
+        self.assertNotIn('Новый пост', response.content.decode())
+        self.assertNotIn('Last-Modified', response)
+        # Реплика догнала основную базу (bulk_create без сигналов не
+        # меняет версию ленты).
+        Post.objects.using(TEST_REPLICA).bulk_create(
+            [Post(author_id=self.author.pk, text='Новый пост')])
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            response = anonymous.get(reverse('posts:index'))
+        self.assertIn('Новый пост', response.content.decode())
+        self.assertIn('Last-Modified', response)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_pin_without_replicas(self):
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertNotIn(StickyPrimaryMiddleware.COOKIE, response.cookies)
+        self.assertIn('Новый пост', self.index())
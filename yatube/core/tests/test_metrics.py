@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+
+
+def sample(text, name):
+    """Значение строки метрики name из ответа /metrics/."""
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_endpoint_is_protected(self):
+        """Без токена или с чужим токеном метрики недоступны."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_can_read_metrics(self):
+        self.client.force_login(
+            User.objects.create_user(username='admin', is_staff=True))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_records_request_per_view(self):
+        """Запрос попадает в гистограммы с меткой имени URL."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertEqual(sample(
+            text, 'yatube_request_duration_seconds_count'
+                  '{view="posts:index"}'), 2)
+        self.assertGreater(sample(
+            text, 'yatube_template_render_seconds_sum'
+                  '{view="posts:index"}'), 0)
+        self.assertEqual(sample(
+            text, 'yatube_request_duration_seconds_bucket'
+                  '{view="posts:index",le="+Inf"}'), 2)
+        self.assertGreater(sample(
+            text, 'yatube_db_queries_sum{view="posts:index"}'), 0)
+
+    def test_counts_cache_hits_and_misses(self):
+        """Первый запрос ленты промахивается мимо кеша, второй попадает."""
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        misses = sample(
+            text, 'yatube_cache_misses_total{view="posts:index"}')
+        self.assertGreater(misses, 0)
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertGreater(sample(
+            text, 'yatube_cache_hits_total{view="posts:index"}'), 0)
+
+    def test_unresolved_urls_share_label(self):
+        self.client.get('/no/such/page/')
+        self.assertEqual(sample(
+            self.scrape(),
+            'yatube_request_duration_seconds_count{view="<unresolved>"}'), 1)
@@ -0,0 +1,91 @@
+import inspect
+
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import queries
+from core.testing import LOCMEM_CACHE
+from posts import views
+from posts.models import Post
+
+User = get_user_model()
+
+
+class QueryInspectorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            Post.objects.create(
+                text='Пост', author=User.objects.create_user(f'user{i}'))
+
+    def test_shape_drops_values(self):
+        self.assertEqual(
+            queries.shape(
+                "SELECT * FROM t WHERE a = %s AND b = 'x' AND c IN "
+                "(%s, %s, 3) LIMIT 10"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) '
+            'LIMIT ?')
+
+    def test_finds_repeats_in_code(self):
+        with queries.QueryInspector(threshold=3) as inspector:
+            for post in Post.objects.all():
+                post.author.username
+        self.assertEqual(len(inspector), 6)
+        [repeat] = inspector.repeats()
+        self.assertEqual(repeat.count, 5)
+        self.assertIn('auth_user', repeat.shape)
+        self.assertIn('core/tests/test_queries.py', repeat.location)
+        self.assertIn('test_finds_repeats_in_code', inspector.report())
+
+    def test_finds_repeats_in_template(self):
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}\n'
+            '{% endfor %}')
+        with queries.QueryInspector(threshold=3) as inspector:
+            template.render(Context({'posts': Post.objects.all()}))
+        [repeat] = inspector.repeats()
+        self.assertIn('шаблон <unknown source>:2', repeat.location)
+
+    def test_select_related_has_no_repeats(self):
+        with queries.QueryInspector(threshold=3) as inspector:
+            for post in Post.objects.select_related('author'):
+                post.author.username
+        self.assertEqual(inspector.repeats(), [])
+
+    def test_reports_slow_queries(self):
+        with queries.QueryInspector(slow=1e-9) as inspector:
+            Post.objects.count()
+        [query] = inspector.slow()
+        self.assertIn('COUNT(*)', query.sql)
+        self.assertIn('медленный запрос', inspector.report())
+
+
+@LOCMEM_CACHE
+class QueryInspectionMiddlewareTests(TestCase):
+    @override_settings(QUERY_INSPECTION=True,
+                       QUERY_BUDGETS={'posts:index': 0})
+    def test_logs_budget_overrun(self):
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            Client().get(reverse('posts:index'))
+        self.assertIn('при бюджете 0', logs.output[0])
+
+    def test_disabled_by_default(self):
+        with self.assertRaises(AssertionError), \
+                self.assertLogs('core.middleware', 'WARNING'):
+            Client().get(reverse('posts:index'))
+
+    @override_settings(QUERY_INSPECTION=True, SLOW_QUERY_TIME=0)
+    def test_location_skips_instrumentation(self):
+        """Место запроса - строка view, а не обертки MetricsMiddleware."""
+        User.objects.create_user(username='author')
+        source = inspect.getsource(views)
+        line = source[:source.index(
+            'user_profile = get_object_or_404')].count('\n') + 1
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            Client().get(
+                reverse('posts:profile', kwargs={'username': 'author'}))
+        report = '\n'.join(logs.output)
+        self.assertIn(f'posts/views.py:{line} in profile', report)
+        self.assertNotIn('core/metrics.py', report)
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from core import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,20 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def metrics(request):
+    """Метрики процесса в формате Prometheus.
+
+    Доступны по токену settings.METRICS_TOKEN в заголовке
+    Authorization: Bearer <токен> или сотрудникам сайта.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or bool(token) and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode())
+    if not allowed:
+        return permission_denied(request, None)
+    return HttpResponse(
+        metrics_registry.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
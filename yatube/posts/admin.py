@@ -1,9 +1,19 @@
 from django.contrib import admin
 
-from .models import Group, Post
+from core.paginators import EstimatedCountPaginator
+from . import search
+from .models import Comment, Follow, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class BaseAdmin(admin.ModelAdmin):
+    """Список без COUNT(*) по всей таблице."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+@admin.register(Post)
+class PostAdmin(BaseAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,20 +21,42 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
-
+    date_hierarchy = 'pub_date'
 
-admin.site.register(Post, PostAdmin)
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по индексу полнотекстового поиска, а не LIKE по text."""
+        words = search.terms(search_term)
+        if not words:
+            return queryset, False
+        return search.get_backend().filter(queryset, words), False
 
 
-class GroupAdmin(admin.ModelAdmin):
+@admin.register(Group)
+class GroupAdmin(BaseAdmin):
     list_display = ('title', 'slug', 'description')
-    search_fields = ('text',)
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+    ordering = ('title',)
+
+
+@admin.register(Comment)
+class CommentAdmin(BaseAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'post')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    search_fields = ('=author__username',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
 
 
-admin.site.register(Group)
+@admin.register(Follow)
+class FollowAdmin(BaseAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
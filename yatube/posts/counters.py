@@ -0,0 +1,86 @@
+"""Счетчики постов в лентах.
+
+Количество постов главной ленты и групп хранится в модели FeedCounter
+и обновляется сигналами при сохранении и удалении Post, поэтому
+пагинаторам лент не нужен COUNT(*) по таблице постов. Счетчик,
+которого еще нет, создается один раз по фактическому количеству
+постов. Количество постов автора хранится только в
+AuthorProfile.post_count (posts.stats); ключ author_key - это ключ
+версии ленты автора в кеше, а не счетчика.
+"""
+from django.db.models import F, Sum
+
+from . import stats
+from .models import AuthorProfile, FeedCounter, Post
+
+INDEX_KEY = 'index'
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def author_key(author_id):
+    return f'author:{author_id}'
+
+
+def counter_keys(group_id):
+    """Возвращает ключи счетчиков FeedCounter лент, в которые
+    попадает пост."""
+    keys = [INDEX_KEY]
+    if group_id is not None:
+        keys.append(group_key(group_id))
+    return keys
+
+
+def post_keys(group_id, author_id):
+    """Возвращает ключи всех лент, в которые попадает пост."""
+    return counter_keys(group_id) + [author_key(author_id)]
+
+
+def change(keys, delta):
+    """Изменяет счетчики keys на delta.
+
+    Несуществующие счетчики не создаются: при первом чтении
+    они будут посчитаны по таблице постов.
+    """
+    if not keys:
+        return
+    counters = FeedCounter.objects.filter(key__in=keys)
+    if delta < 0:
+        counters = counters.filter(count__gte=-delta)
+    counters.update(count=F('count') + delta)
+
+
+def get_count(key, objects):
+    """Возвращает счетчик key, создавая его по objects.count()."""
+    count = (FeedCounter.objects.filter(key=key)
+             .values_list('count', flat=True).first())
+    if count is None:
+        counter, _ = FeedCounter.objects.get_or_create(
+            key=key, defaults={'count': objects.count()})
+        count = counter.count
+    return count
+
+
+def index_count():
+    return get_count(INDEX_KEY, Post.objects.all())
+
+
+def group_count(group):
+    return get_count(group_key(group.pk), group.posts.all())
+
+
+def author_count(author):
+    return stats.get_profile(author.pk).post_count
+
+
+def follow_count(user):
+    """Количество постов авторов, на которых подписан user."""
+    authors = set(user.follower.values_list('author', flat=True))
+    profiles = AuthorProfile.objects.filter(user_id__in=authors)
+    for author_id in authors - set(
+            profiles.values_list('user_id', flat=True)):
+        stats.get_profile(author_id)
+    total = profiles.aggregate(total=Sum('post_count'))['total']
+    return total or 0
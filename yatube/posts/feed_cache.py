@@ -0,0 +1,153 @@
+"""Версии лент для кеширования страниц.
+
+У каждой ленты есть версия в кеше: 'index', 'group:<id>',
+'author:<id>' и 'follow:<user_id>'. Сигналы Post, Comment и Follow
+обновляют версии затронутых лент, а ключ кеша страницы включает
+версию, поэтому закешированные страницы не устаревают и могут жить
+часами. Версия - это время последнего изменения ленты.
+Пока с изменения не прошло REPLICA_PIN_SECONDS, реплика может его
+еще не содержать, поэтому view, читающий с реплики, ничего не
+кеширует под такой версией: ни фрагменты, ни значения memoize, ни
+ETag и Last-Modified.
+Версия 'groups' меняется с любой группой и сбрасывает варианты
+выбора группы в PostForm.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.http import quote_etag
+
+from core import db
+from core.cache import get_or_set
+
+GROUPS = 'groups'
+
+
+def follow(user_id):
+    return f'follow:{user_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def _version_key(feed):
+    return f'feed_version:{feed}'
+
+
+def timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 60 * 60 * 4)
+
+
+def _set_versions(feeds):
+    now = repr(time.time())
+    cache.set_many(
+        {_version_key(feed): now for feed in feeds}, timeout=None)
+
+
+def bump(*feeds):
+    """Обновляет версии лент feeds.
+
+    Внутри транзакции версии обновляются еще раз после ее фиксации:
+    страница, закешированная до фиксации, могла не увидеть изменений.
+    """
+    _set_versions(feeds)
+    if connection.in_atomic_block:
+        transaction.on_commit(partial(_set_versions, feeds))
+
+
+def get_versions(*feeds):
+    """Возвращает версии лент feeds, создавая отсутствующие."""
+    keys = {_version_key(feed): feed for feed in feeds}
+    versions = cache.get_many(keys)
+    missing = keys.keys() - versions.keys()
+    if missing:
+        now = repr(time.time())
+        new = {key: now for key in missing}
+        cache.set_many(new, timeout=None)
+        versions.update(new)
+    return [versions[key] for key in keys]
+
+
+def _replica_may_lag(versions):
+    """Может ли реплика, из которой читает запрос, еще не содержать
+    изменений, давших версии versions."""
+    return (db.reads_from_replica()
+            and time.time() - max(float(version) for version in versions)
+            < settings.REPLICA_PIN_SECONDS)
+
+
+def changed_at(*feeds):
+    """Время последнего изменения лент feeds (по их версиям) или None,
+    если его нельзя отдавать клиенту: страница читается с реплики,
+    которая могла еще не получить изменения."""
+    versions = get_versions(*feeds)
+    if _replica_may_lag(versions):
+        return None
+    return datetime.fromtimestamp(
+        max(float(version) for version in versions), timezone.utc)
+
+
+def page_token(request):
+    """Часть ETag, которая определяет запрошенную страницу.
+
+    ETag проверяется до выборки страницы, поэтому берется из запроса;
+    в кеше он ничего не хранит.
+    """
+    for param in ('after', 'before', 'page'):
+        value = request.GET.get(param)
+        if value:
+            return f'{param}={value}'
+    return 'page=1'
+
+
+def cache_context(page, *feeds):
+    """Контекст для тега {% cache %} страницы ленты.
+
+    Страница в ключе - это cache_token страницы page, которую выбрал
+    пагинатор: некорректные ?page= и курсоры не создают новых записей
+    в кеше.
+    """
+    versions = get_versions(*feeds)
+    parts = [f'{feed}@{version}' for feed, version in zip(feeds, versions)]
+    return {
+        'feed_cache_key': '|'.join(parts + [page.cache_token]),
+        # С нулевым сроком {% cache %} не сохраняет фрагмент.
+        'feed_cache_timeout': 0 if _replica_may_lag(versions) else timeout(),
+    }
+
+
+def memoize(name, feeds, func, *args, **kwargs):
+    """Функция, возвращающая func(*args, **kwargs) из кеша.
+
+    Значение пересчитывается после смены версии любой из лент feeds.
+    """
+    def cached():
+        versions = get_versions(*feeds)
+        if _replica_may_lag(versions):
+            return func(*args, **kwargs)
+        parts = [f'{feed}@{version}'
+                 for feed, version in zip(feeds, versions)]
+        return get_or_set('|'.join([name] + parts),
+                          partial(func, *args, **kwargs), timeout())
+    return cached
+
+
+def etag(request, feeds, *parts):
+    """Строгий ETag страницы лент feeds.
+
+    Зависит от версий лент, запрошенной страницы и частей parts.
+    Если страница читается с отстающей реплики, возвращает None.
+    """
+    versions = get_versions(*feeds)
+    if _replica_may_lag(versions):
+        return None
+    key = '|'.join(
+        [f'{feed}@{version}' for feed, version in zip(feeds, versions)]
+        + [str(part) for part in parts] + [page_token(request)])
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
@@ -0,0 +1,46 @@
+"""QuerySet'ы лент постов и комментариев.
+
+Все ленты (главная, группы, профиля, подписок) строятся здесь:
+автор и группа подгружаются тем же запросом, что и посты, а колонки,
+которые шаблоны лент не используют, не выбираются.
+"""
+from . import timeline
+from .models import Comment, Post
+
+AUTHOR_DEFERRED_FIELDS = (
+    'author__password',
+    'author__last_login',
+    'author__is_superuser',
+    'author__email',
+    'author__is_staff',
+    'author__is_active',
+    'author__date_joined',
+)
+DEFERRED_FIELDS = AUTHOR_DEFERRED_FIELDS + ('group__description',)
+
+
+def feed(posts):
+    """Подготавливает QuerySet постов к выводу в ленте."""
+    return posts.select_related('author', 'group').defer(*DEFERRED_FIELDS)
+
+
+def index_feed():
+    return feed(Post.objects.all())
+
+
+def group_feed(group):
+    return feed(group.posts.all())
+
+
+def profile_feed(author):
+    return feed(author.posts.all())
+
+
+def follow_feed(user):
+    return feed(timeline.follow_posts(user))
+
+
+def comment_feed(post_id):
+    """Комментарии поста вместе с авторами."""
+    return (Comment.objects.filter(post_id=post_id)
+            .select_related('author').defer(*AUTHOR_DEFERRED_FIELDS))
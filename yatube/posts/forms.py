@@ -1,8 +1,26 @@
 from django import forms
 
-from .models import Post, Group, Comment
+from . import feed_cache
+from .models import Post, Comment
 
-group_list = Group.objects.all().values_list('title')
+"""Варианты поля group: (версия списка групп, варианты)."""
+_group_choices = (None, [])
+
+
+def group_choices(field):
+    """Возвращает варианты поля field выбора группы.
+
+    Варианты хранятся в памяти процесса и выбираются из базы заново,
+    только когда сигналы Group сменили версию feed_cache.GROUPS.
+    """
+    global _group_choices
+    version, choices = _group_choices
+    current, = feed_cache.get_versions(feed_cache.GROUPS)
+    if version != current:
+        choices = [('', field.empty_label)] + list(
+            field.queryset.values_list('pk', 'title'))
+        _group_choices = (current, choices)
+    return choices
 
 
 class PostForm(forms.ModelForm):
@@ -16,15 +34,14 @@ class PostForm(forms.ModelForm):
         text = forms.CharField(
             label='Текст поста',
         )
-        group = forms.ModelChoiceField(label='Группа',
-                                       required=False,
-                                       queryset=group_list,
-                                       empty_label='---------',
-                                       )
         image = forms.ImageField(
             label='Картинка поста',
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].choices = group_choices(self.fields['group'])
+
 
 class CommentForm(forms.ModelForm):
     """Модель формы создания нового поста"""
@@ -0,0 +1,101 @@
+"""HTTP-кеширование страниц лент и поста.
+
+Для анонимных пользователей страница получает Last-Modified и
+Cache-Control: public, а запрос с If-Modified-Since получает ответ
+304 без рендеринга страницы, поэтому такие страницы может отдавать
+кеширующий прокси. Last-Modified - это самое позднее из времени
+нового поста (комментария) и времени изменения версии ленты: версия
+меняется и при правке или удалении, которые не меняют даты постов.
+Страницы авторизованных пользователей содержат персональные данные и
+помечаются Cache-Control: private. Все ответы получают Vary: Cookie.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date
+
+from . import counters, feed_cache
+from .models import Comment, Group, Post, User
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def max_age():
+    return getattr(settings, 'HTTP_CACHE_MAX_AGE', 60)
+
+
+def _newest(objects):
+    return (objects.order_by('-pub_date')
+            .values_list('pub_date', flat=True).first())
+
+
+def _last_modified(dates, *feeds):
+    changed_at = feed_cache.changed_at(*feeds)
+    if changed_at is None:
+        return None
+    return max([date for date in dates if date is not None]
+               + [changed_at])
+
+
+def index_last_modified(request):
+    return _last_modified(
+        [_newest(Post.objects.all())], counters.INDEX_KEY)
+
+
+def group_last_modified(request, slug):
+    group_id = (Group.objects.filter(slug=slug)
+                .values_list('pk', flat=True).first())
+    if group_id is None:
+        return None
+    return _last_modified(
+        [_newest(Post.objects.filter(group_id=group_id))],
+        counters.group_key(group_id))
+
+
+def profile_last_modified(request, username):
+    author_id = (User.objects.filter(username=username)
+                 .values_list('pk', flat=True).first())
+    if author_id is None:
+        return None
+    return _last_modified(
+        [_newest(Post.objects.filter(author_id=author_id))],
+        counters.author_key(author_id))
+
+
+def post_last_modified(request, post_id):
+    return _last_modified(
+        [_newest(Post.objects.filter(pk=post_id)),
+         _newest(Comment.objects.filter(post_id=post_id))],
+        feed_cache.post(post_id))
+
+
+def cache_headers(last_modified_func):
+    """Декоратор view-функции: HTTP-кеширование страницы.
+
+    last_modified_func(request, *args, **kwargs) возвращает время
+    изменения страницы или None, если его не определить.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.user.is_authenticated
+                    or request.method not in SAFE_METHODS):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ['Cookie'])
+                return response
+            last_modified = last_modified_func(request, *args, **kwargs)
+            timestamp = last_modified and int(last_modified.timestamp())
+            response = get_conditional_response(
+                request, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if timestamp and response.status_code in (200, 304):
+                response['Last-Modified'] = http_date(timestamp)
+                patch_cache_control(response, public=True, max_age=max_age())
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
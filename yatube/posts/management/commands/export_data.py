@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии или подписки '
+            'в NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.SPECS)
+        parser.add_argument(
+            '--output', help='Файл выгрузки (по умолчанию - stdout).')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='Выгрузить строки с pk больше этого значения.')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: последний выгруженный pk. '
+                 'С ним выгрузка продолжается и дописывает --output.')
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        resume = transfer.read_checkpoint(options['checkpoint'])
+        kwargs = {
+            'fmt': options['format'],
+            'after': options['after'],
+            'checkpoint': options['checkpoint'],
+            'batch_size': options['batch_size'],
+        }
+        if not options['output']:
+            exported = transfer.export(
+                options['model'], self.stdout, **kwargs)
+        else:
+            mode = 'a' if resume else 'w'
+            with open(options['output'], mode, newline='',
+                      encoding='utf-8') as stream:
+                exported = transfer.export(
+                    options['model'], stream, header=not stream.tell(),
+                    **kwargs)
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {exported}.'))
@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(name):
+    thumbnails.generate(name)
+    return name
+
+
+class Command(BaseCommand):
+    help = ('Создает недостающие варианты миниатюр для картинок '
+            'существующих постов в нескольких процессах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов (по умолчанию - число ядер).')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Проверить все картинки, а не только без вариантов.')
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct()
+        )
+        missing = [
+            name for name in names.iterator()
+            if options['force'] or thumbnails.lookup(name) is None
+        ]
+        if not missing:
+            self.stdout.write('Все варианты миниатюр уже созданы.')
+            return
+        for done, name in enumerate(
+                self.map(_generate, missing, options['workers']), start=1):
+            self.stdout.write(f'[{done}/{len(missing)}] {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {len(missing)}.'))
+
+    def map(self, func, items, workers):
+        if workers == 1:
+            yield from map(func, items)
+            return
+        # Соединения с базой не должны наследоваться процессами пула.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup
+        ) as executor:
+            yield from executor.map(func, items)
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии или подписки '
+            'из NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.SPECS)
+        parser.add_argument(
+            '--input', help='Файл загрузки (по умолчанию - stdin).')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: число загруженных строк. '
+                 'С ним загрузка продолжается с первой незагруженной.')
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'fmt': options['format'],
+            'checkpoint': options['checkpoint'],
+            'batch_size': options['batch_size'],
+        }
+        try:
+            if not options['input']:
+                loaded = transfer.load(options['model'], sys.stdin, **kwargs)
+            else:
+                with open(options['input'], newline='',
+                          encoding='utf-8') as stream:
+                    loaded = transfer.load(
+                        options['model'], stream, **kwargs)
+        except (IntegrityError, KeyError, ValueError,
+                ValidationError) as error:
+            raise CommandError(f'Строка не загружена: {error!r}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {loaded}.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает Post.comment_count и счетчики AuthorProfile '
+            'по таблицам и исправляет расхождения.')
+
+    def handle(self, *args, **options):
+        for counter, repaired in stats.reconcile().items():
+            self.stdout.write(f'{counter}: {repaired}')
+        self.stdout.write(self.style.SUCCESS('Счетчики сверены.'))
@@ -0,0 +1,195 @@
+import random
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import transfer
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'котики', 'собаки', 'погода', 'город', 'утро', 'вечер', 'книга',
+    'фильм', 'музыка', 'дорога', 'море', 'горы', 'работа', 'отпуск',
+    'кофе', 'чай', 'дождь', 'снег', 'солнце', 'друзья', 'проект',
+    'python', 'django', 'код', 'тесты', 'сегодня', 'вчера', 'завтра',
+    'очень', 'немного', 'снова', 'наконец', 'хорошо', 'интересно',
+)
+NO_GROUP_SHARE = 0.4
+PERIOD = timedelta(days=365)
+# Столько повторов подряд - и подписки добираются без возвращения.
+MAX_MISSES = 100
+
+
+def zipf(count, skew):
+    """Накопленные веса распределения Ципфа для count элементов:
+    элемент с рангом r выбирается с вероятностью ~ 1 / r ** skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу пользователями, группами, постами, '
+            'комментариями и подписками с неравномерным, как на живом '
+            'сайте, распределением: немногие авторы пишут большую часть '
+            'постов и собирают большую часть подписчиков, а новые посты '
+            'комментируют чаще старых.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа (неравномерность).')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.skew = options['skew']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        usernames = self.create_users(options['users'])
+        # Самые активные авторы выбираются случайно, а не по порядку.
+        self.rng.shuffle(usernames)
+        self.authors = usernames
+        self.author_weights = zipf(len(usernames), self.skew)
+        self.load('groups', self.groups(options['groups']))
+        self.load('posts', self.posts(options['posts']))
+        self.load('comments', self.comments(options['comments']))
+        self.load('follows', self.follow_rows(options['follows']))
+        self.stdout.write(self.style.SUCCESS('База заполнена.'))
+
+    def load(self, name, rows):
+        loaded = transfer.load_rows(name, rows, batch_size=self.batch_size)
+        self.stdout.write(f'{name}: {loaded}')
+
+    def create_users(self, count):
+        start = next_id(User)
+        usernames = [f'seed{start + i}' for i in range(count)]
+        password = make_password(None)
+        for i in range(0, count, self.batch_size):
+            User.objects.bulk_create(
+                (User(username=username, password=password)
+                 for username in usernames[i:i + self.batch_size]),
+                ignore_conflicts=True)
+        self.stdout.write(f'users: {count}')
+        return usernames
+
+    def text(self):
+        length = min(300, max(3, int(self.rng.lognormvariate(2.5, 0.8))))
+        return ' '.join(self.rng.choices(WORDS, k=length)).capitalize()
+
+    def author(self):
+        return self.rng.choices(
+            self.authors, cum_weights=self.author_weights)[0]
+
+    def groups(self, count):
+        start = next_id(Group)
+        for pk in range(start, start + count):
+            yield {
+                'id': pk,
+                'title': f'Группа {pk}',
+                'slug': f'seed-group-{pk}',
+                'description': self.text(),
+            }
+
+    def posts(self, count):
+        groups = list(Group.objects.values_list('pk', flat=True))
+        group_weights = zipf(len(groups), self.skew)
+        start = next_id(Post)
+        step = PERIOD / max(count, 1)
+        for i in range(count):
+            group = None
+            if groups and self.rng.random() >= NO_GROUP_SHARE:
+                group = self.rng.choices(
+                    groups, cum_weights=group_weights)[0]
+            yield {
+                'id': start + i,
+                'pub_date': self.now - PERIOD + step * i,
+                'text': self.text(),
+                'author': self.author(),
+                'group': group,
+                'image': '',
+            }
+
+    def comments(self, count):
+        posts = Post.objects.order_by('-pk').values_list('pk', 'pub_date')
+        post_ids = array('q')
+        post_dates = array('d')
+        for pk, pub_date in posts.iterator():
+            post_ids.append(pk)
+            post_dates.append(pub_date.timestamp())
+        if not post_ids:
+            return
+        # Новые посты в начале списка и получают больше комментариев.
+        weights = zipf(len(post_ids), self.skew)
+        indexes = range(len(post_ids))
+        start = next_id(Comment)
+        now = self.now.timestamp()
+        for pk in range(start, start + count):
+            index = self.rng.choices(indexes, cum_weights=weights)[0]
+            posted = post_dates[index]
+            yield {
+                'id': pk,
+                'pub_date': datetime.fromtimestamp(
+                    posted + self.rng.random() * (now - posted),
+                    timezone.utc),
+                'text': self.text(),
+                'author': self.rng.choice(self.authors),
+                'post': post_ids[index],
+            }
+
+    def follows(self, count):
+        total = len(self.authors) * (len(self.authors) - 1)
+        count = min(count, total)
+        pairs = set()
+        misses = 0
+        while len(pairs) < count and misses < MAX_MISSES:
+            pair = (self.rng.choice(self.authors), self.author())
+            if pair[0] == pair[1] or pair in pairs:
+                misses += 1
+                continue
+            misses = 0
+            pairs.add(pair)
+            yield pair
+        # Почти все вероятные пары заняты: остальные выбираются
+        # равномерно из свободных, иначе выборка не закончится.
+        if len(pairs) < count:
+            yield from self.free_pairs(pairs, count - len(pairs), total)
+
+    def free_pairs(self, taken, count, total):
+        """count случайных пар (подписчик, автор) без повторов,
+        не входящих в taken."""
+        others = len(self.authors) - 1
+        indexes = self.rng.sample(
+            range(total), min(total, count + len(taken)))
+        for index in indexes:
+            if not count:
+                return
+            user, author = divmod(index, others)
+            if author >= user:
+                author += 1
+            pair = (self.authors[user], self.authors[author])
+            if pair not in taken:
+                count -= 1
+                yield pair
+
+    def follow_rows(self, count):
+        pk = next_id(Follow)
+        for user, author in self.follows(count):
+            yield {'id': pk, 'user': user, 'author': author}
+            pk += 1
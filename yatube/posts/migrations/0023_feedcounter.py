@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    FeedCounter = apps.get_model('posts', 'FeedCounter')
+    db = schema_editor.connection.alias
+    posts = Post.objects.using(db)
+    counters = [FeedCounter(key='index', count=posts.count())]
+    for field in ('group', 'author'):
+        rows = (posts.filter(**{f'{field}__isnull': False})
+                .values(field).annotate(total=Count('pk')).order_by())
+        counters += [
+            FeedCounter(key=f'{field}:{row[field]}', count=row['total'])
+            for row in rows
+        ]
+    FeedCounter.objects.using(db).bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_auto_20220206_1438'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(model, field, ref):
+    rows = (model.objects.filter(**{field: OuterRef(ref)}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(rows), 0)
+
+
+def fill_author_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorProfile = apps.get_model('posts', 'AuthorProfile')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    db = schema_editor.connection.alias
+    Post.objects.using(db).update(
+        comment_count=count_of(Comment, 'post', 'pk'))
+    users = User.objects.using(db).annotate(
+        post_count=count_of(Post, 'author', 'pk'),
+        comment_count=count_of(Comment, 'author', 'pk'),
+        follower_count=count_of(Follow, 'author', 'pk'),
+        following_count=count_of(Follow, 'user', 'pk'),
+    ).values('pk', 'post_count', 'comment_count', 'follower_count',
+             'following_count')
+    AuthorProfile.objects.using(db).bulk_create(
+        (AuthorProfile(user_id=counts.pop('pk'), **counts)
+         for counts in users.iterator()),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0025_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.CreateModel(
+            name='AuthorProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='author_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(
+            fill_author_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:30
+
+from django.db import migrations
+
+
+def drop_author_counters(apps, schema_editor):
+    """Количество постов автора хранится в AuthorProfile.post_count."""
+    FeedCounter = apps.get_model('posts', 'FeedCounter')
+    FeedCounter.objects.using(schema_editor.connection.alias).filter(
+        key__startswith='author:').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0028_post_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            drop_author_counters, migrations.RunPython.noop),
+    ]
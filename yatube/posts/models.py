@@ -43,12 +43,25 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True)
 
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False)
+
     def __str__(self):
         count_symbol = 15
         return self.text[:count_symbol]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_idx'),
+        ]
 
 
 class Comment(CreatedModel):
@@ -70,6 +83,12 @@ class Comment(CreatedModel):
         verbose_name='Комментарий',
         help_text='Комментарии')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'pub_date', 'id'],
+                         name='comment_post_date_idx'),
+        ]
+
 
 class Follow(models.Model):
     """Модель для хранения связей между авторами и
@@ -88,5 +107,80 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'),
+        ]
+
     def __str__(self):
         return f"Подписчик: '{self.user}', автор: '{self.author}'"
+
+
+class AuthorProfile(models.Model):
+    """Модель для хранения счетчиков пользователя.
+
+    Ключевые аргументы:
+    user -- ссылка на пользователя,
+    post_count -- количество постов пользователя,
+    comment_count -- количество комментариев пользователя,
+    follower_count -- количество подписчиков пользователя,
+    following_count -- количество авторов, на которых он подписан
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='author_profile')
+    post_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'Счетчики пользователя {self.user}'
+
+
+class FeedCounter(models.Model):
+    """Модель для хранения количества постов в лентах.
+
+    Ключевые аргументы:
+    key -- ключ ленты: 'index', 'group:<id>' или 'author:<id>',
+    count -- количество постов в ленте
+    """
+    key = models.CharField(max_length=64, unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.key}: {self.count}'
+
+
+class TimelineEntry(models.Model):
+    """Модель для хранения ленты подписок пользователя.
+
+    Запись добавляется каждому подписчику при публикации поста,
+    поэтому лента подписок читается из одного индекса по user.
+
+    Ключевые аргументы:
+    user -- ссылка на подписчика, которому показывается пост,
+    post -- ссылка на пост автора, на которого подписан user,
+    pub_date -- копия даты публикации поста для сортировки
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_date_idx'),
+        ]
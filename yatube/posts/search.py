@@ -0,0 +1,201 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд поиска задается настройкой SEARCH_BACKEND. Бэкенд хранит
+индекс текстов постов (index, remove, rebuild) и возвращает id
+найденных постов в порядке релевантности (count, ids). Индекс
+обновляется сигналами при сохранении и удалении поста; после
+массовых изменений (QuerySet.update, смена бэкенда) его пересобирает
+команда rebuild_search_index.
+
+SQLiteFTSBackend хранит индекс в виртуальной таблице FTS5
+posts_post_fts (создается миграцией): поиск читает только
+инвертированный индекс, а не тексты всех постов. SimpleBackend
+индекса не ведет и ищет LIKE по Post.text - он подходит только для
+баз без FTS5.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from . import feeds
+from .models import Post
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 10
+BATCH_SIZE = 1000
+
+
+def terms(query):
+    """Слова запроса без операторов и знаков препинания."""
+    return TERM_RE.findall(query)[:MAX_TERMS]
+
+
+class SearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    def index(self, post):
+        """Добавляет пост в индекс или обновляет его текст."""
+
+    def index_many(self, posts):
+        """Добавляет в индекс посты posts."""
+        for post in posts:
+            self.index(post)
+
+    def remove(self, post_id):
+        """Удаляет пост из индекса."""
+
+    def rebuild(self):
+        """Заново строит индекс по всем постам."""
+
+    def filter(self, posts, words):
+        """Оставляет в QuerySet posts посты, в которых есть все
+        слова words."""
+        raise NotImplementedError
+
+    def count(self, words):
+        """Количество постов, в которых есть все слова words."""
+        raise NotImplementedError
+
+    def ids(self, words, start, stop):
+        """id найденных постов с start по stop в порядке
+        релевантности."""
+        raise NotImplementedError
+
+
+class SimpleBackend(SearchBackend):
+    """Поиск без индекса: LIKE по тексту, новые посты первыми."""
+
+    def filter(self, posts, words):
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        return posts
+
+    def count(self, words):
+        return self.filter(Post.objects.all(), words).count()
+
+    def ids(self, words, start, stop):
+        posts = self.filter(Post.objects.all(), words)
+        return list(posts.order_by('-pub_date', '-pk')
+                    .values_list('pk', flat=True)[start:stop])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Поиск по индексу SQLite FTS5 с ранжированием bm25.
+
+    Каждое слово запроса ищется как префикс, поэтому по запросу
+    "пост" находятся и "посты", и "постов".
+    """
+    table = 'posts_post_fts'
+
+    def _execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def index(self, post):
+        self._execute(
+            f'INSERT OR REPLACE INTO {self.table}(rowid, text) '
+            f'VALUES (%s, %s)', [post.pk, post.text])
+
+    def index_many(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table}(rowid, text) '
+                f'VALUES (%s, %s)', [(post.pk, post.text) for post in posts])
+
+    def remove(self, post_id):
+        self._execute(
+            f'DELETE FROM {self.table} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        self._execute(f'DELETE FROM {self.table}')
+        last = 0
+        while True:
+            rows = list(Post.objects.filter(pk__gt=last).order_by('pk')
+                        .values_list('pk', 'text')[:BATCH_SIZE])
+            if not rows:
+                return
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {self.table}(rowid, text) '
+                    f'VALUES (%s, %s)', rows)
+            last = rows[-1][0]
+
+    @staticmethod
+    def match(words):
+        """Выражение MATCH: все слова как префиксы в кавычках, чтобы
+        пользовательский ввод не разбирался как синтаксис FTS5."""
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def filter(self, posts, words):
+        matched = RawSQL(
+            f'SELECT rowid FROM {self.table} '
+            f'WHERE {self.table} MATCH %s', [self.match(words)])
+        return posts.filter(pk__in=matched)
+
+    def count(self, words):
+        return self._execute(
+            f'SELECT count(*) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s', [self.match(words)])[0][0]
+
+    def ids(self, words, start, stop):
+        rows = self._execute(
+            f'SELECT rowid FROM {self.table} '
+            f'WHERE {self.table} MATCH %s '
+            f'ORDER BY rank LIMIT %s OFFSET %s',
+            [self.match(words), stop - start, start])
+        return [pk for pk, in rows]
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _load(settings.SEARCH_BACKEND)
+
+
+class SearchResults:
+    """Найденные посты в порядке релевантности.
+
+    Поддерживает count() и срезы, поэтому разбивается на страницы
+    обычным Paginator: бэкенд отдает id только запрошенной страницы,
+    а посты выбираются одним запросом ленты.
+    """
+
+    def __init__(self, query, backend=None):
+        self.words = terms(query)
+        self.backend = backend or get_backend()
+
+    @cached_property
+    def _count(self):
+        if not self.words:
+            return 0
+        return self.backend.count(self.words)
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop, _ = key.indices(self._count)
+        if not self.words or start >= stop:
+            return []
+        ids = self.backend.ids(self.words, start, stop)
+        posts = feeds.index_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search(query):
+    """Возвращает SearchResults для строки запроса query."""
+    return SearchResults(query)
@@ -0,0 +1,165 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, search, stats, timeline
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_feeds(sender, instance, **kwargs):
+    """Запоминает ленты, в которых пост был до изменения."""
+    instance._old_feed_keys = []
+    instance._old_counter_keys = []
+    instance._old_author_id = None
+    if instance.pk is None:
+        return
+    old = (Post.objects.filter(pk=instance.pk)
+           .values_list('group_id', 'author_id').first())
+    if old is not None:
+        instance._old_feed_keys = counters.post_keys(*old)
+        instance._old_counter_keys = counters.counter_keys(old[0])
+        instance._old_author_id = old[1]
+
+
+@receiver(post_save, sender=Post)
+def update_post_counters(sender, instance, created, **kwargs):
+    """Обновляет счетчики лент после сохранения поста."""
+    new_keys = counters.counter_keys(instance.group_id)
+    old_keys = getattr(instance, '_old_counter_keys', [])
+    if created:
+        counters.change(new_keys, 1)
+        return
+    counters.change(set(old_keys) - set(new_keys), -1)
+    counters.change(set(new_keys) - set(old_keys), 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrease_post_counters(sender, instance, **kwargs):
+    counters.change(counters.counter_keys(instance.group_id), -1)
+
+
+@receiver(post_save, sender=Post)
+def update_post_count(sender, instance, created, **kwargs):
+    """Обновляет количество постов автора (и прежнего автора)."""
+    old_author_id = getattr(instance, '_old_author_id', None)
+    if created:
+        stats.change(instance.author_id, 'post_count', 1)
+    elif old_author_id not in (None, instance.author_id):
+        stats.change(old_author_id, 'post_count', -1)
+        stats.change(instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrease_post_count(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def increase_comment_counts(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+        stats.change(instance.author_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comment_counts(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+    stats.change(instance.author_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def increase_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'follower_count', 1)
+        stats.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrease_follow_counts(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'follower_count', -1)
+    stats.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Добавляет новый пост в ленты подписчиков."""
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    """Сбрасывает кеш страниц лент, в которых был или стал пост."""
+    new_keys = counters.post_keys(instance.group_id, instance.author_id)
+    old_keys = getattr(instance, '_old_feed_keys', [])
+    feed_cache.bump(
+        feed_cache.post(instance.pk), *set(old_keys) | set(new_keys))
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_feeds(sender, instance, **kwargs):
+    feed_cache.bump(
+        feed_cache.post(instance.pk),
+        *counters.post_keys(instance.group_id, instance.author_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Обновляет текст поста в индексе поиска."""
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_feeds(sender, instance, **kwargs):
+    if instance.post_id is None:
+        return
+    post = (Post.objects.filter(pk=instance.post_id)
+            .values_list('group_id', 'author_id').first())
+    if post is not None:
+        feed_cache.bump(
+            feed_cache.post(instance.post_id), *counters.post_keys(*post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.follow(instance.user_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_stats(sender, instance, **kwargs):
+    feed_cache.bump(stats.version(instance.author_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_stats(sender, instance, **kwargs):
+    feed_cache.bump(
+        stats.version(instance.author_id), stats.version(instance.user_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_groups(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.GROUPS)
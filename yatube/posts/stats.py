@@ -0,0 +1,153 @@
+"""Статистика авторов: количество постов, комментариев и подписок.
+
+Количество постов, комментариев, подписчиков и подписок
+пользователя хранится в AuthorProfile, количество комментариев к
+посту - в Post.comment_count. Эти поля обновляют F-выражениями
+сигналы сохранения и удаления постов, комментариев и подписок (в том
+числе из админки и при каскадном удалении), а расхождения после
+массовых операций в обход сигналов (bulk_create, update) исправляет
+команда reconcile_counters (reconcile).
+
+Статистика автора целиком кешируется под версиями 'author:<id>'
+(меняется с постами автора) и 'stats:<id>' (меняется с его
+комментариями и подписками).
+"""
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import counters, feed_cache
+from .models import AuthorProfile, Comment, Follow, Post
+
+User = get_user_model()
+
+AuthorStats = namedtuple(
+    'AuthorStats', ['posts', 'comments', 'followers', 'following'])
+
+PROFILE_FIELDS = (
+    'post_count', 'comment_count', 'follower_count', 'following_count')
+BATCH_SIZE = 500
+
+
+def version(author_id):
+    return f'stats:{author_id}'
+
+
+def _count_of(model, field, ref='pk'):
+    rows = (model.objects.filter(**{field: OuterRef(ref)}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(rows), 0)
+
+
+def _profile_counts(ref):
+    return {
+        'post_count': _count_of(Post, 'author', ref),
+        'comment_count': _count_of(Comment, 'author', ref),
+        'follower_count': _count_of(Follow, 'author', ref),
+        'following_count': _count_of(Follow, 'user', ref),
+    }
+
+
+def get_profile(user_id):
+    """Возвращает AuthorProfile пользователя, создавая его по
+    фактическим количествам."""
+    profile = AuthorProfile.objects.filter(user_id=user_id).first()
+    if profile is None:
+        counts = (User.objects.filter(pk=user_id)
+                  .annotate(**_profile_counts('pk'))
+                  .values(*PROFILE_FIELDS).get())
+        profile, _ = AuthorProfile.objects.get_or_create(
+            user_id=user_id, defaults=counts)
+    return profile
+
+
+def change(user_id, field, delta):
+    """Изменяет счетчик field профиля пользователя на delta.
+
+    Профиль, которого еще нет, не создается: при первом чтении
+    он будет посчитан по таблицам.
+    """
+    profiles = AuthorProfile.objects.filter(user_id=user_id)
+    if delta < 0:
+        profiles = profiles.filter(**{f'{field}__gte': -delta})
+    profiles.update(**{field: F(field) + delta})
+
+
+def _compute(author_id):
+    profile = get_profile(author_id)
+    return AuthorStats(
+        posts=profile.post_count,
+        comments=profile.comment_count,
+        followers=profile.follower_count,
+        following=profile.following_count,
+    )
+
+
+def get(author_id):
+    """Возвращает AuthorStats автора с id author_id."""
+    return feed_cache.memoize(
+        'stats', [counters.author_key(author_id), version(author_id)],
+        _compute, author_id)()
+
+
+def _repair(objects, field, actual, feeds):
+    """Исправляет field у объектов, где он отличается от actual.
+
+    Возвращает количество исправленных объектов.
+    """
+    drifted = (objects.annotate(actual=actual)
+               .exclude(**{field: F('actual')})
+               .order_by('pk').values_list('pk', flat=True))
+    repaired = 0
+    last = 0
+    while True:
+        pks = list(drifted.filter(pk__gt=last)[:BATCH_SIZE])
+        if not pks:
+            return repaired
+        repaired += _repair_batch(objects, field, actual, feeds, pks)
+        last = pks[-1]
+
+
+def _repair_batch(objects, field, actual, feeds, pks):
+    objects = objects.filter(pk__in=pks)
+    feed_cache.bump(*feeds(objects))
+    return objects.update(**{field: actual})
+
+
+def _post_feeds(posts):
+    feeds = set()
+    for pk, group_id, author_id in posts.values_list(
+            'pk', 'group_id', 'author_id'):
+        feeds.add(feed_cache.post(pk))
+        feeds.update(counters.post_keys(group_id, author_id))
+    return feeds
+
+
+def _profile_feeds(profiles):
+    return [version(user_id)
+            for user_id in profiles.values_list('user_id', flat=True)]
+
+
+def reconcile():
+    """Создает недостающие профили и исправляет расхождения
+    счетчиков с таблицами.
+
+    Возвращает словарь {счетчик: количество исправленных строк}.
+    """
+    missing = (User.objects.filter(author_profile__isnull=True)
+               .annotate(**_profile_counts('pk'))
+               .values('pk', *PROFILE_FIELDS))
+    created = len(AuthorProfile.objects.bulk_create(
+        (AuthorProfile(user_id=counts.pop('pk'), **counts)
+         for counts in missing.iterator()),
+        batch_size=BATCH_SIZE))
+    result = {'profiles created': created}
+    result['Post.comment_count'] = _repair(
+        Post.objects.all(), 'comment_count',
+        _count_of(Comment, 'post'), _post_feeds)
+    for field, actual in _profile_counts('user_id').items():
+        result[f'AuthorProfile.{field}'] = _repair(
+            AuthorProfile.objects.all(), field, actual, _profile_feeds)
+    return result
@@ -0,0 +1,16 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Готовые варианты картинки поста или None.
+
+    Посты ленты получают варианты заранее (thumbnails.attach).
+    """
+    if hasattr(post, 'thumbnail'):
+        return post.thumbnail
+    return thumbnails.get_cached(post.image)
@@ -0,0 +1,84 @@
+import warnings
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginators import EstimatedCountPaginator
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='testslug', description='')
+        cls.post = Post.objects.create(
+            author=cls.admin, group=cls.group, text='Котики во дворе')
+        Comment.objects.create(author=cls.admin, post=cls.post, text='Да')
+        Follow.objects.create(
+            user=User.objects.create_user(username='reader'),
+            author=cls.admin)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        return self.client.get(
+            reverse(f'admin:posts_{model._meta.model_name}_changelist'),
+            params)
+
+    def test_changelists(self):
+        for model in (Post, Group, Comment, Follow):
+            with self.subTest(model=model):
+                response = self.changelist(model)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_post_changelist_query_count(self):
+        """Число запросов списка постов не растет с числом постов."""
+        with CaptureQueriesContext(connection) as queries:
+            self.changelist(Post)
+        Post.objects.bulk_create(
+            Post(author=self.admin, group=self.group, text=f'Пост {i}')
+            for i in range(20))
+        with self.assertNumQueries(len(queries)):
+            self.changelist(Post)
+
+    def test_post_search_uses_index(self):
+        Post.objects.create(author=self.admin, text='Собаки')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.changelist(Post, q='котик')
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
+        self.assertTrue(any('posts_post_fts' in query['sql']
+                            for query in queries.captured_queries))
+
+    def test_group_autocomplete(self):
+        """Подсказки групп разбиты на страницы по упорядоченной выборке."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = self.client.get(
+                reverse('admin:posts_group_autocomplete'), {'term': 'Тест'})
+        self.assertEqual(response.json()['results'][0]['text'],
+                         str(self.group))
+
+    def test_large_list_count_is_estimated(self):
+        with mock.patch.object(EstimatedCountPaginator, 'COUNT_LIMIT', 1):
+            Post.objects.create(author=self.admin, text='Еще пост')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.changelist(Post)
+            self.assertEqual(response.context['cl'].result_count, 2)
+            self.assertFalse(any('COUNT' in query['sql']
+                                 for query in queries.captured_queries))
+            response = self.changelist(Post, q='пост')
+            self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+EXTRA_COMMENTS = 5
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                author=User.objects.create_user(username=f'reader{i}'),
+                post=cls.post,
+                text=f'Комментарий {i}',
+            )
+            for i in range(COMMENTS_PER_PAGE + EXTRA_COMMENTS)
+        ]
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.comments_url = reverse(
+            'posts:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        """Страница поста выводит первую страницу комментариев."""
+        response = Client().get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[:COMMENTS_PER_PAGE])
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'js-more-comments')
+        self.assertNotContains(
+            response, self.comments[COMMENTS_PER_PAGE].text)
+
+    def test_comments_endpoint_returns_next_page(self):
+        """Следующая страница отдается в JSON по курсору."""
+        first = Client().get(self.comments_url).json()
+        self.assertEqual(len(first['comments']), COMMENTS_PER_PAGE)
+        self.assertEqual(first['comments'][0]['author'], 'reader0')
+        second = Client().get(first['next']).json()
+        self.assertEqual(
+            [comment['id'] for comment in second['comments']],
+            [comment.pk for comment in self.comments[COMMENTS_PER_PAGE:]])
+        self.assertIsNone(second['next'])
+
+    def test_comments_endpoint_html_fragment(self):
+        """При format=html отдается HTML-фрагмент без ссылки на
+        следующую страницу в конце ленты."""
+        page = Client().get(self.comments_url).json()
+        cursor = page['next'].split('after=')[1]
+        response = Client().get(
+            self.comments_url, {'format': 'html', 'after': cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertContains(response, self.comments[-1].text)
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_comments_page_query_count(self):
+        """Авторы комментариев выбираются тем же запросом."""
+        with self.assertNumQueries(2):
+            Client().get(self.comments_url)
+
+    def test_comments_endpoint_unknown_post(self):
+        response = Client().get(
+            reverse('posts:post_comments', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
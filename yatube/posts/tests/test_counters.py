@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.paginators import CountedPaginator
+from posts import counters
+from posts.models import AuthorProfile, FeedCounter, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='testslug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа2',
+            slug='testslug2',
+            description='Тестовое описание2',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def create_post(self, group=None):
+        return Post.objects.create(
+            author=self.author, text='Тестовый пост', group=group)
+
+    def test_counters_are_created_from_posts(self):
+        """Отсутствующий счетчик считается по таблице постов."""
+        self.create_post(self.group)
+        self.create_post()
+        FeedCounter.objects.all().delete()
+        self.assertEqual(counters.index_count(), 2)
+        self.assertEqual(counters.group_count(self.group), 1)
+        self.assertEqual(counters.author_count(self.author), 2)
+        self.assertEqual(counters.follow_count(self.follower), 2)
+
+    def test_counters_follow_post_changes(self):
+        """Счетчики обновляются при создании, правке и удалении поста."""
+        self.assertEqual(counters.group_count(self.group), 0)
+        self.assertEqual(counters.group_count(self.group2), 0)
+        self.assertEqual(counters.author_count(self.author), 0)
+        post = self.create_post(self.group)
+        self.assertEqual(counters.group_count(self.group), 1)
+        self.assertEqual(counters.author_count(self.author), 1)
+
+        post.group = self.group2
+        post.save()
+        self.assertEqual(counters.group_count(self.group), 0)
+        self.assertEqual(counters.group_count(self.group2), 1)
+
+        post.delete()
+        self.assertEqual(counters.group_count(self.group2), 0)
+        self.assertEqual(counters.author_count(self.author), 0)
+        self.assertEqual(counters.index_count(), 0)
+
+    def test_author_count_comes_from_profile(self):
+        """Количество постов автора хранится только в AuthorProfile."""
+        post = self.create_post(self.group)
+        self.assertEqual(counters.author_count(self.author), 1)
+        self.create_post()
+        post.delete()
+        self.assertEqual(counters.author_count(self.author), 1)
+        self.assertEqual(counters.follow_count(self.follower), 1)
+        self.assertEqual(
+            AuthorProfile.objects.get(user=self.author).post_count, 1)
+        self.assertFalse(
+            FeedCounter.objects.filter(key__startswith='author:').exists())
+
+    def test_counted_paginator_does_not_count_queryset(self):
+        """CountedPaginator берет количество записей из счетчика."""
+        for _ in range(3):
+            self.create_post()
+        paginator = CountedPaginator(
+            Post.objects.all(), 1, counters.index_count)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 3)
+
+    def test_page_window(self):
+        """Ссылки на страницы выводятся окном вокруг текущей."""
+        paginator = CountedPaginator(Post.objects.all(), 10, count=200)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(paginator.get_page_window(1),
+                         [1, 2, 3, ellipsis, 20])
+        self.assertEqual(paginator.get_page_window(10),
+                         [1, ellipsis, 8, 9, 10, 11, 12, ellipsis, 20])
+        self.assertEqual(paginator.get_page_window(20),
+                         [1, ellipsis, 18, 19, 20])
+        small = CountedPaginator(Post.objects.all(), 10, count=30)
+        self.assertEqual(small.get_page_window(2), [1, 2, 3])
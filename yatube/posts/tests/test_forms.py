@@ -4,6 +4,7 @@ import tempfile
 from posts.forms import PostForm, CommentForm
 from posts.models import Post, Group
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
@@ -185,3 +186,32 @@ class CommentCreateFormTests(TestCase):
             data=form_data)
         self.assertRedirects(response, reverse(
             'posts:post_detail', kwargs={'post_id': '1'}))
+
+
+class GroupChoicesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG)
+
+    def test_choices_are_cached_until_groups_change(self):
+        """Форма не выбирает группы, пока они не изменились."""
+        self.assertIn((self.group.pk, GROUP_TITLE),
+                      PostForm().fields['group'].choices)
+        with self.assertNumQueries(0):
+            form = PostForm()
+            form.as_p()
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertIn((self.group.pk, 'Новое название'),
+                      PostForm().fields['group'].choices)
+        self.group.delete()
+        self.assertEqual(
+            PostForm().fields['group'].choices, [('', '---------')])
+
+    def test_form_validates_group(self):
+        form = PostForm(data={'text': POST_TEXT, 'group': self.group.pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['group'], self.group)
+        form = PostForm(data={'text': POST_TEXT, 'group': 0})
+        self.assertFalse(form.is_valid())
@@ -0,0 +1,82 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class HttpCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='testslug', description='')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:allrecord', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def later(self, seconds=10):
+        """Сдвигает время версий лент на seconds секунд вперед."""
+        clock = mock.Mock(time=mock.Mock(return_value=time.time() + seconds))
+        return mock.patch('posts.feed_cache.time', clock)
+
+    def test_anonymous_pages_are_public(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertIn('Last-Modified', response)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('max-age=', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_authorized_pages_are_private(self):
+        client = Client()
+        client.force_login(self.author)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertNotIn('Last-Modified', response)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отдается ответом 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                modified = Client().get(url)['Last-Modified']
+                response = Client().get(
+                    url, HTTP_IF_MODIFIED_SINCE=modified)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_changes_update_last_modified(self):
+        """Правка поста и новый комментарий меняют Last-Modified."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        modified = Client().get(url)['Last-Modified']
+        with self.later(10):
+            self.post.text = 'Исправленный пост'
+            self.post.save()
+        response = Client().get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        modified = response['Last-Modified']
+        with self.later(20):
+            Comment.objects.create(
+                author=self.author, post=self.post, text='Комментарий')
+        response = Client().get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,78 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post
+from posts.views import COUNT_OBJECT
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.match = Post.objects.create(
+            author=cls.author, text='Котики, котики и еще раз котики')
+        cls.other = Post.objects.create(
+            author=cls.author, text='Котики и собаки гуляют во дворе')
+
+    def found(self, query):
+        return list(search.search(query)[:COUNT_OBJECT])
+
+    def test_ranked_results(self):
+        """Пост, где слово встречается чаще, выводится первым."""
+        self.assertEqual(self.found('котики'), [self.match, self.other])
+        self.assertEqual(self.found('кот'), [self.match, self.other])
+        self.assertEqual(self.found('СОБАКИ котики'), [self.other])
+        self.assertEqual(self.found('двор'), [self.other])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ('"', 'собаки OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                search.search(query)[:COUNT_OBJECT]
+
+    def test_index_follows_save_and_delete(self):
+        post = Post.objects.create(author=self.author, text='Хомяки')
+        self.assertEqual(self.found('хомяки'), [post])
+        post.text = 'Попугаи'
+        post.save()
+        self.assertEqual(self.found('хомяки'), [])
+        self.assertEqual(self.found('попугаи'), [post])
+        post.delete()
+        self.assertEqual(self.found('попугаи'), [])
+
+    def test_rebuild(self):
+        Post.objects.filter(pk=self.other.pk).update(text='Попугаи')
+        self.assertEqual(self.found('попугаи'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('попугаи'), [self.other])
+
+    def test_simple_backend(self):
+        results = search.SearchResults('и', search.SimpleBackend())
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(list(results[:COUNT_OBJECT]),
+                         [self.other, self.match])
+
+    def test_search_page_is_paginated(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Еще раз котики {i}')
+            for i in range(COUNT_OBJECT - 1))
+        call_command('rebuild_search_index', stdout=StringIO())
+        url = reverse('posts:post_search')
+        response = Client().get(url, {'q': 'раз котики'})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         COUNT_OBJECT)
+        self.assertEqual(len(response.context['page_obj']), COUNT_OBJECT)
+        self.assertContains(response, 'Котики, котики')
+        response = Client().get(url, {'q': 'котики'})
+        self.assertContains(response, '?q=%D0%BA')
+        with self.assertNumQueries(3):
+            response = Client().get(url, {'q': 'котики', 'page': 2})
+            self.assertEqual(
+                list(response.context['page_obj']), [self.other])
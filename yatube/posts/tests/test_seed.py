@@ -0,0 +1,63 @@
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import search, stats
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class SeedDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, **options):
+        options = {'users': 50, 'groups': 5, 'posts': 400,
+                   'comments': 300, 'follows': 150, **options}
+        call_command('seed_data', stdout=StringIO(), **options)
+
+    def test_creates_requested_rows(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 150)
+
+    def test_follows_near_maximum(self):
+        """Почти все возможные подписки набираются без зависания."""
+        self.seed(follows=50 * 49 - 5)
+        self.assertEqual(Follow.objects.count(), 50 * 49 - 5)
+
+    def test_distribution_is_skewed(self):
+        """Самый активный автор пишет во много раз больше медианного."""
+        self.seed()
+        posts = sorted(Counter(
+            Post.objects.values_list('author', flat=True)).values())
+        self.assertGreater(posts[-1], posts[len(posts) // 2] * 5)
+
+    def test_derived_data_is_consistent(self):
+        self.seed()
+        self.assertTrue(all(
+            repaired == 0 for repaired in stats.reconcile().values()))
+        self.assertTrue(TimelineEntry.objects.exists())
+        texts = Post.objects.values_list('text', flat=True)
+        self.assertEqual(
+            search.search('котики').count(),
+            sum('котики' in text.lower() for text in texts))
+
+    def test_same_seed_same_data(self):
+        self.seed(seed=7)
+        texts = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True))
+        Post.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list(
+                'text', flat=True)),
+            texts)
@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import stats
+from posts.models import AuthorProfile, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Post.objects.create(author=cls.reader, text='Чужой пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_follow_changes(self):
+        """Статистика обновляется при публикации, комментировании
+        и подписке через view-функции."""
+        self.assertEqual(
+            stats.get(self.author.pk), stats.AuthorStats(1, 0, 0, 0))
+        author_client = Client()
+        author_client.force_login(self.author)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        author_client.post(reverse('posts:post_create'), {'text': 'Еще'})
+        author_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(
+            stats.get(self.author.pk), stats.AuthorStats(2, 1, 1, 0))
+        self.assertEqual(stats.get(self.reader.pk).following, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]),
+            HTTP_REFERER='/')
+        self.assertEqual(
+            stats.get(self.author.pk), stats.AuthorStats(2, 1, 0, 0))
+        self.assertEqual(stats.get(self.reader.pk).following, 0)
+
+    def test_stats_follow_deletes(self):
+        """Удаления в обход view-функций (админка, каскады, shell)
+        обновляют счетчики и пагинацию профиля."""
+        stats.get(self.author.pk)
+        posts = [Post.objects.create(author=self.author, text='Пост')
+                 for _ in range(11)]
+        comment = Comment.objects.create(
+            author=self.reader, post=self.post, text='Комментарий')
+        Comment.objects.create(
+            author=self.reader, post=posts[0], text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            stats.get(self.author.pk), stats.AuthorStats(12, 0, 1, 0))
+        self.assertEqual(stats.get(self.reader.pk).comments, 2)
+
+        comment.delete()
+        Post.objects.filter(pk__in=[post.pk for post in posts[:3]]).delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(
+            stats.get(self.author.pk), stats.AuthorStats(9, 0, 0, 0))
+        self.assertEqual(stats.get(self.reader.pk), stats.AuthorStats(
+            1, 0, 0, 0))
+        response = Client().get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(len(response.context['page_obj']), 9)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_reconcile_repairs_drift(self):
+        """reconcile_counters исправляет расхождения счетчиков."""
+        stats.get(self.author.pk)
+        # bulk_create не отправляет сигналы, как seed_data.
+        Comment.objects.bulk_create([Comment(
+            author=self.reader, post=self.post, text='Комментарий')])
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)])
+        AuthorProfile.objects.filter(user=self.author).update(post_count=7)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Post.comment_count: 1', out.getvalue())
+        self.assertIn('AuthorProfile.post_count: 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(
+            stats.get(self.author.pk), stats.AuthorStats(1, 0, 1, 0))
+        self.assertEqual(stats.get(self.reader.pk).following, 1)
+
+    def test_stats_are_cached(self):
+        stats.get(self.author.pk)
+        with self.assertNumQueries(0):
+            stats.get(self.author.pk)
+
+    def test_post_detail_does_not_count_all_posts(self):
+        """Страница поста не считает посты, комментарии и подписки."""
+        stats.get(self.author.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(
+                reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.context['author_stats'].posts, 1)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT', query['sql'])
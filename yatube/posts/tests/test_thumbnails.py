@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_missing_thumbnail_renders_placeholder(self):
+        """Без готовой миниатюры выводится заглушка, а генерация
+        ставится в очередь."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio')
+        schedule.assert_called_once_with(self.post.image)
+
+    def test_generated_thumbnail_is_rendered(self):
+        """После генерации страница выводит миниатюру."""
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.get_cached(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.src)
+        self.assertNotContains(response, 'aspect-ratio')
+
+    def test_variants_cover_all_widths(self):
+        """srcset содержит все ширины в каждом формате."""
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.get_cached(self.post.image)
+        srcsets = [thumbnail.srcset] + [
+            srcset for _, srcset in thumbnail.sources]
+        self.assertEqual(
+            len(thumbnail.sources), len(thumbnails.formats()) - 1)
+        for srcset in srcsets:
+            for width in thumbnails.WIDTHS:
+                self.assertIn(f' {width}w', srcset)
+
+    def test_generate_thumbnails_command(self):
+        """Команда создает варианты для картинок без миниатюр."""
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIsNotNone(thumbnails.lookup(self.post.image.name))
+        self.assertIn('Обработано картинок: 1.', out.getvalue())
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('уже созданы', out.getvalue())
+
+    def test_resolve_fetches_page_in_one_query(self):
+        """Варианты всех картинок читаются из базы одним запросом."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.author,
+                text=f'Пост {i}',
+                image=SimpleUploadedFile(
+                    f'small{i}.gif', SMALL_GIF, content_type='image/gif'),
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with self.assertNumQueries(1):
+            resolved = thumbnails.resolve(post.image.name for post in posts)
+        self.assertTrue(all(resolved.values()))
+        with self.assertNumQueries(0):
+            thumbnails.attach(posts)
+        self.assertEqual(
+            posts[0].thumbnail, resolved[self.post.image.name])
+
+    def test_feed_posts_get_thumbnails(self):
+        """Посты страницы ленты получают атрибут thumbnail."""
+        thumbnails.generate(self.post.image.name)
+        response = Client().get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        self.assertEqual(
+            post.thumbnail, thumbnails.lookup(self.post.image.name))
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.paginators import CursorPaginator
+from posts import feeds
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.another_reader = User.objects.create_user(username='another')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self):
+        return Post.objects.create(author=self.author, text='Тестовый пост')
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка переносит посты автора в ленту, отписка удаляет."""
+        old_post = self.create_post()
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(feeds.follow_feed(self.reader)), [old_post])
+
+        new_post = self.create_post()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post,
+            pub_date=new_post.pub_date).exists())
+        self.assertEqual(
+            set(feeds.follow_feed(self.reader)), {old_post, new_post})
+
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertFalse(feeds.follow_feed(self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_request(self):
+        """Посты популярного автора добавляются к ленте при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.another_reader, author=self.author)
+        post = self.create_post()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(feeds.follow_feed(self.reader)), [post])
+        self.assertEqual(list(feeds.follow_feed(self.another_reader)), [post])
+
+        Follow.objects.get(user=self.another_reader).delete()
+        self.assertEqual(list(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post', flat=True)), [post.pk])
+        self.assertEqual(list(feeds.follow_feed(self.reader)), [post])
+
+    def test_follow_feed_pages_read_timeline_index(self):
+        """Страницы ленты подписок читаются по индексу ленты без
+        сортировки всех ее записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [self.create_post() for _ in range(3)]
+        paginator = CursorPaginator(feeds.follow_feed(self.reader), 2)
+        first_page = paginator.get_page(1)
+        self.assertEqual(list(first_page), posts[:0:-1])
+        cursor_page = paginator.get_cursor_page(
+            after=str(first_page.next_cursor))
+        self.assertEqual(list(cursor_page), posts[:1])
+        feed = paginator.object_list
+        pages = {
+            'first': feed[:3],
+            'second': feed[2:5],
+            'after': feed.filter(
+                paginator._seek([posts[1].pub_date, posts[1].pk]))[:3],
+        }
+        for name, queryset in pages.items():
+            with self.subTest(page=name):
+                plan = queryset.explain()
+                self.assertIn('timeline_user_date_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,133 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import search, stats, transfer
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+MODELS = ('groups', 'posts', 'comments', 'follows')
+POST_DATE = timezone.make_aware(datetime.datetime(2022, 1, 1, 22, 24))
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='testslug', description='Про "это"')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text='Котики'),
+            Post.objects.create(author=cls.author, text='Собаки,\nи "еще"'),
+        ]
+        Post.objects.filter(pk=cls.posts[0].pk).update(pub_date=POST_DATE)
+        Comment.objects.create(
+            author=cls.reader, post=cls.posts[0], text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def snapshot(self):
+        """Строки всех моделей; пользователи - по username."""
+        return {
+            name: list(spec.model.objects.order_by('pk')
+                       .values_list(*spec.lookups))
+            for name, spec in transfer.SPECS.items()
+        }
+
+    def round_trip(self, fmt):
+        before = self.snapshot()
+        for name in MODELS:
+            call_command('export_data', name, format=fmt,
+                         output=self.path(name), stderr=StringIO())
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        for name in MODELS:
+            call_command('import_data', name, format=fmt,
+                         input=self.path(name), stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_ndjson_round_trip(self):
+        self.round_trip('ndjson')
+        author = User.objects.get(username='author')
+        self.assertEqual(Post.objects.get(text='Котики').pub_date, POST_DATE)
+        self.assertEqual(stats.get(author.pk), stats.AuthorStats(2, 0, 1, 0))
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).comment_count, 1)
+        self.assertEqual(
+            list(search.search('котики')[:1]), [self.posts[0]])
+        self.assertEqual(TimelineEntry.objects.count(), 2)
+
+    def test_csv_round_trip(self):
+        self.round_trip('csv')
+
+    def test_export_resumes_from_checkpoint(self):
+        checkpoint = self.path('checkpoint')
+        with open(checkpoint, 'w') as file:
+            file.write(str(self.posts[0].pk))
+        with open(self.path('posts'), 'w') as file:
+            file.write('{"id": %d}\n' % self.posts[0].pk)
+        call_command('export_data', 'posts', output=self.path('posts'),
+                     checkpoint=checkpoint, stderr=StringIO())
+        with open(self.path('posts')) as file:
+            self.assertEqual(len(file.readlines()), 2)
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), str(self.posts[1].pk))
+
+    def test_csv_export_after_writes_header(self):
+        """Новый файл получает заголовок CSV и при --after."""
+        call_command('export_data', 'posts', format='csv',
+                     after=self.posts[0].pk, output=self.path('posts'),
+                     stderr=StringIO())
+        Post.objects.filter(pk=self.posts[1].pk).delete()
+        call_command('import_data', 'posts', format='csv',
+                     input=self.path('posts'), stdout=StringIO())
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[1].pk).text, self.posts[1].text)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Строки до контрольной точки не загружаются повторно,
+        а строки с занятыми pk пропускаются."""
+        call_command('export_data', 'posts', output=self.path('posts'),
+                     stderr=StringIO())
+        Post.objects.filter(pk=self.posts[1].pk).delete()
+        changed = Post.objects.get(pk=self.posts[0].pk)
+        changed.text = 'Изменен'
+        changed.save()
+        checkpoint = self.path('checkpoint')
+        with open(checkpoint, 'w') as file:
+            file.write('0')
+        call_command('import_data', 'posts', input=self.path('posts'),
+                     checkpoint=checkpoint, batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', flat=True)),
+            ['Изменен', self.posts[1].text])
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), '2')
+        self.assertEqual(list(search.search('котики')), [])
+        self.assertEqual(
+            list(search.search('изменен')), [self.posts[0]])
+        Post.objects.filter(pk=self.posts[1].pk).delete()
+        call_command('import_data', 'posts', input=self.path('posts'),
+                     checkpoint=checkpoint, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=self.posts[1].pk).exists())
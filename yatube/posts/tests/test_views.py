@@ -1,12 +1,17 @@
+import base64
+import json
 import shutil
 import tempfile
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from posts.models import Post, Group, Follow
+from core.testing import LOCMEM_CACHE, QueryBudgetMixin
+from posts.models import Comment, Post, Group, Follow
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
@@ -75,6 +80,7 @@ class PostsPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.unauthorized_user = Client()
         self.post_author = Client()
         self.post_author.force_login(self.user_author)
@@ -191,17 +197,7 @@ class PostsPagesTests(TestCase):
         self.assertEqual(post_text, POST_TEXT)
         self.assertEqual(post_group, GROUP_TITLE)
         self.assertEqual(post_description, GROUP_DESCRIPTION)
-        response = self.authorized_user.get(reverse('posts:post_detail',
-                                                    kwargs={'post_id': '1'})
-                                            )
-
-        second_object = response.context['posts'][0]
-        posts_text = second_object.text
-        posts_group = second_object.group.title
-        posts_description = second_object.group.description
-        self.assertEqual(posts_text, POST_TEXT)
-        self.assertEqual(posts_group, GROUP_TITLE)
-        self.assertEqual(posts_description, GROUP_DESCRIPTION)
+        self.assertEqual(response.context['author_stats'].posts, 1)
 
         post_image_0 = first_object.image
         self.assertEqual(post_image_0, 'posts/small.gif')
@@ -249,18 +245,27 @@ class PostsPagesTests(TestCase):
         self.assertEqual(post_image_0, 'posts/small.gif')
 
         post_id = PostsPagesTests.post.id
-        instance = Post.objects.get(pk=post_id)
-        instance.delete()
+        Post.objects.filter(pk=post_id).update(text='Текст без сигнала')
 
         new_response = self.authorized_user.get(reverse('posts:index'))
         new_content = new_response.content
         self.assertEqual(content, new_content)
 
-        cache.clear()
+        instance = Post.objects.get(pk=post_id)
+        instance.delete()
         new_new_response = self.authorized_user.get(reverse('posts:index'))
         new_new_content = new_new_response.content
         self.assertNotEqual(content, new_new_content)
 
+    def test_cache_follow_page_invalidated_by_new_post(self):
+        """Новый пост автора сбрасывает кеш ленты подписок."""
+        url = reverse('posts:follow_index')
+        content = self.authorized_user.get(url).content
+        self.assertEqual(content, self.authorized_user.get(url).content)
+        Post.objects.create(author=self.user_author, text='Новый пост')
+        self.assertIn(
+            'Новый пост', self.authorized_user.get(url).content.decode())
+
 
 object_list = []
 
@@ -317,3 +322,198 @@ class PaginatorViewsTest(TestCase):
         response = self.client.get(reverse(
             'posts:profile', kwargs={'username': 'user_author'}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']), COUNT_POST_SECOND)
+
+    def test_index_cursor_pages(self):
+        """Переход по курсорам возвращает соседние страницы."""
+        first_page = self.client.get(reverse('posts:index')).context[
+            'page_obj']
+        response = self.client.get(
+            reverse('posts:index') + f'?after={first_page.next_cursor}')
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), COUNT_POST_SECOND)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        self.assertEqual(
+            list(second_page), list(Post.objects.order_by(
+                '-pub_date', '-pk')[COUNT_POST_FIRST:]))
+
+        response = self.client.get(
+            reverse('posts:index') + f'?before={second_page.previous_cursor}')
+        previous_page = response.context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertFalse(previous_page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор возвращает первую страницу."""
+        response = self.client.get(reverse('posts:index') + '?after=broken')
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), COUNT_POST_FIRST)
+
+    def test_feed_pages_do_not_count_posts(self):
+        """Страницы лент не выполняют COUNT(*) по таблице постов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:allrecord', kwargs={'slug': GROUP_SLUG}),
+            reverse('posts:profile', kwargs={'username': 'user_author'}),
+        )
+        for url in urls:
+            self.client.get(url)
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql']
+                ])
+
+    def test_pages_are_cached_separately(self):
+        """Каждая страница ленты кешируется под своим ключом."""
+        cache.clear()
+        first = self.client.get(reverse('posts:index')).content
+        second = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first, second.content)
+        self.assertEqual(len(second.context['page_obj']), COUNT_POST_SECOND)
+
+    def test_cache_key_uses_resolved_page(self):
+        """Ключ кеша страницы определяет страница, выбранная
+        пагинатором, а не значения ?page= и курсоров из запроса."""
+        url = reverse('posts:index')
+
+        def cache_key(query):
+            return self.client.get(url + query).context['feed_cache_key']
+
+        first_key = cache_key('')
+        for query in ('?page=1', '?page=abc', '?after=broken'):
+            with self.subTest(query=query):
+                self.assertEqual(cache_key(query), first_key)
+        last_key = cache_key('?page=2')
+        for query in ('?page=-1', '?page=99999'):
+            with self.subTest(query=query):
+                self.assertEqual(cache_key(query), last_key)
+
+        page = self.client.get(url).context['page_obj']
+        last = page[-1]
+        # Тот же ключ пагинации, записанный по-другому.
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            [last.pub_date.isoformat(), str(last.pk)]).encode()).decode()
+        self.assertEqual(
+            cache_key(f'?after={cursor}'),
+            cache_key(f'?after={page.next_cursor}'))
+        self.assertNotEqual(cache_key(f'?after={cursor}'), first_key)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FeedQueryBudgetTests(TestCase):
+    """Количество запросов ленты не зависит от числа постов на странице.
+
+    Бюджет считается для кеша в памяти: кеш в базе добавил бы
+    собственные запросы.
+    """
+    QUERY_BUDGET = {
+        'posts:index': 4,
+        'posts:allrecord': 5,
+        'posts:profile': 6,
+        'posts:follow_index': 7,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='user_author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for _ in range(COUNT_POST_FIRST):
+            Post.objects.create(
+                author=cls.author, text=POST_TEXT, group=cls.group)
+
+    def setUp(self):
+        self.authorized_user = Client()
+        self.authorized_user.force_login(self.reader)
+        cache.clear()
+
+    def test_feed_query_budget(self):
+        """Страница ленты укладывается в бюджет запросов."""
+        kwargs = {
+            'posts:allrecord': {'slug': GROUP_SLUG},
+            'posts:profile': {'username': 'user_author'},
+        }
+        for name, budget in self.QUERY_BUDGET.items():
+            url = reverse(name, kwargs=kwargs.get(name))
+            self.authorized_user.get(url)
+            cache.clear()
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                response = self.authorized_user.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), COUNT_POST_FIRST)
+
+
+@LOCMEM_CACHE
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Страницы укладываются в бюджеты settings.QUERY_BUDGETS и не
+    выполняют запросов в цикле по постам и комментариям."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user_author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for _ in range(COUNT_POST_FIRST):
+            cls.post = Post.objects.create(
+                author=cls.author, text=POST_TEXT, group=cls.group)
+        for i in range(COUNT_POST_FIRST):
+            Comment.objects.create(
+                post=cls.post, text=f'Комментарий {i}',
+                author=User.objects.create_user(username=f'reader{i}'))
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        cache.clear()
+
+    def test_pages_within_budget(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:allrecord', kwargs={'slug': GROUP_SLUG}),
+            reverse('posts:profile', kwargs={'username': 'user_author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+            + '?format=html',
+            reverse('posts:post_search') + '?q=Тестовый',
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                # Первый запрос создает счетчики постов в базе.
+                self.client.get(url)
+                cache.clear()
+                response = self.get_within_budget(self.client, url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cached_post_has_no_private_author_fields(self):
+        """В общий кеш не попадают пароль и почта автора поста."""
+        self.author.email = 'author@example.com'
+        self.author.save()
+        self.client.logout()
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        cached = b''.join(value for value in cache._cache.values())
+        self.assertIn(POST_TEXT.encode(), cached)
+        self.assertNotIn(self.author.password.encode(), cached)
+        self.assertNotIn(b'author@example.com', cached)
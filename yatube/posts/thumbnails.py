@@ -0,0 +1,300 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Для каждой картинки создается набор вариантов: несколько ширин в
+современных форматах, которые умеют сохранять Pillow и sorl-thumbnail
+(WebP, AVIF), и в JPEG для остальных браузеров. Шаблоны выводят их
+через srcset.
+
+Варианты создаются в пуле потоков после фиксации транзакции, в
+которой сохранен пост, а шаблоны только ищут готовые варианты в
+хранилище ключей sorl-thumbnail и, если их еще нет, выводят
+заглушку. Так декодирование и сжатие картинки не выполняется внутри
+запроса. Варианты всех картинок страницы ленты ищутся одним
+обращением к кешу и одним запросом к базе (resolve, attach). После
+генерации версии лент с этим постом обновляются, чтобы
+закешированные страницы с заглушкой пересобрались.
+"""
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import counters, feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (480, 960, 1280)
+QUALITY = 80
+FALLBACK_FORMAT = 'JPEG'
+MODERN_FORMATS = {'AVIF': 'image/avif', 'WEBP': 'image/webp'}
+
+Thumbnail = namedtuple('Thumbnail', ['src', 'srcset', 'sources'])
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class LookupBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, умеющий искать миниатюру без генерации."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, который создал бы get_thumbnail."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = LookupBackend()
+
+
+def _can_save(image_format):
+    Image.init()
+    return image_format in Image.SAVE and image_format in EXTENSIONS
+
+
+def formats():
+    """Форматы вариантов: доступные современные и запасной JPEG."""
+    return [image_format for image_format in MODERN_FORMATS
+            if _can_save(image_format)] + [FALLBACK_FORMAT]
+
+
+def variants():
+    """Возвращает тройки (формат, ширина, геометрия) всех вариантов."""
+    return [
+        (image_format, width, f'{width}x{width * 9 // 16}')
+        for image_format in formats()
+        for width in WIDTHS
+    ]
+
+
+def _options(image_format):
+    return {
+        'crop': 'center',
+        'upscale': True,
+        'quality': QUALITY,
+        'format': image_format,
+    }
+
+
+def _srcset(files):
+    return ', '.join(f'{file.url} {width}w' for width, file in files)
+
+
+def _get_many(files):
+    """Возвращает словарь {ключ файла: ImageFile или None} для files.
+
+    Для хранилища sorl-thumbnail по умолчанию (кеш и база) все ключи
+    читаются одним get_many и одним запросом к базе.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {file.key: kvstore.get(file) for file in files}
+    keys = {add_prefix(file.key): file.key for file in files}
+    values = kvstore.cache.get_many(keys)
+    missing = keys.keys() - values.keys()
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        keys[key]: (None if value == EMPTY_VALUE or not value
+                    else deserialize_image_file(value))
+        for key, value in values.items()
+    }
+
+
+def _thumbnail(found):
+    """Собирает Thumbnail из пар (формат, ширина, файл)."""
+    by_format = {}
+    for image_format, width, file in found:
+        if file is None:
+            return None
+        by_format.setdefault(image_format, []).append((width, file))
+    fallback = by_format.pop(FALLBACK_FORMAT)
+    return Thumbnail(
+        src=fallback[-1][1].url,
+        srcset=_srcset(fallback),
+        sources=[(MODERN_FORMATS[image_format], _srcset(files))
+                 for image_format, files in by_format.items()],
+    )
+
+
+def workers():
+    """Число потоков пула; 0 - создавать миниатюры сразу."""
+    return getattr(settings, 'THUMBNAIL_WORKERS', 2)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='thumbnails')
+        return _executor
+
+
+def _bump_feeds(name):
+    feeds = set()
+    posts = Post.objects.filter(image=name).values_list(
+        'pk', 'group_id', 'author_id')
+    for pk, group_id, author_id in posts:
+        feeds.add(feed_cache.post(pk))
+        feeds.update(counters.post_keys(group_id, author_id))
+    if feeds:
+        feed_cache.bump(*feeds)
+
+
+def generate(name):
+    """Создает недостающие варианты картинки name."""
+    try:
+        for image_format, width, geometry in variants():
+            backend.get_thumbnail(name, geometry, **_options(image_format))
+        if lookup(name) is not None:
+            _bump_feeds(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+
+
+def _generate_in_pool(name):
+    try:
+        generate(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        connection.close()
+
+
+def _submit(name):
+    if not workers():
+        generate(name)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    _get_executor().submit(_generate_in_pool, name)
+
+
+def schedule(image):
+    """Ставит генерацию миниатюры image в очередь после фиксации."""
+    if image:
+        transaction.on_commit(partial(_submit, image.name))
+
+
+def resolve(names):
+    """Возвращает словарь {имя картинки: Thumbnail или None}.
+
+    src - самый большой вариант в JPEG, srcset - все варианты в JPEG,
+    sources - пары (MIME-тип, srcset) для современных форматов.
+    Варианты всех картинок ищутся одним пакетом.
+    """
+    files = {
+        name: [
+            (image_format, width, backend.thumbnail_file(
+                name, geometry, **_options(image_format)))
+            for image_format, width, geometry in variants()
+        ]
+        for name in set(names)
+    }
+    found = _get_many(
+        file for name_files in files.values() for _, _, file in name_files)
+    return {
+        name: _thumbnail(
+            (image_format, width, found[file.key])
+            for image_format, width, file in name_files)
+        for name, name_files in files.items()
+    }
+
+
+def lookup(name):
+    """Возвращает Thumbnail с готовыми вариантами name или None."""
+    return resolve([name])[name]
+
+
+def get_cached(image):
+    """Возвращает готовые варианты image или None.
+
+    Отсутствующие варианты ставятся в очередь на генерацию.
+    """
+    if not image:
+        return None
+    thumbnail = lookup(image.name)
+    if thumbnail is None:
+        schedule(image)
+    return thumbnail
+
+
+def attach(posts):
+    """Добавляет постам атрибут thumbnail с готовыми вариантами.
+
+    Отсутствующие варианты ставятся в очередь на генерацию.
+    """
+    images = [post.image for post in posts if post.image]
+    resolved = resolve(image.name for image in images)
+    for image in images:
+        if resolved[image.name] is None:
+            schedule(image)
+    for post in posts:
+        post.thumbnail = resolved.get(post.image.name)
+    return posts
+
+
+class ThumbnailedPosts:
+    """Посты страницы, которым при первом обращении добавляются
+    миниатюры.
+
+    Страница из кеша шаблона не обращается к списку постов, поэтому
+    ни посты, ни миниатюры для нее не запрашиваются.
+    """
+
+    def __init__(self, posts):
+        self._source = posts
+        self._posts = None
+
+    @property
+    def posts(self):
+        if self._posts is None:
+            self._posts = attach(list(self._source))
+        return self._posts
+
+    def __iter__(self):
+        return iter(self.posts)
+
+    def __len__(self):
+        return len(self.posts)
+
+    def __getitem__(self, index):
+        return self.posts[index]
+
+
+def attach_to_page(page):
+    """Откладывает поиск миниатюр постов page до вывода страницы."""
+    page.object_list = ThumbnailedPosts(page.object_list)
+    return page
@@ -0,0 +1,144 @@
+"""Лента подписок, заполняемая при записи (fan-out on write).
+
+При публикации поста запись TimelineEntry добавляется каждому
+подписчику автора, при подписке в ленту переносятся посты автора,
+при отписке они удаляются. Посты авторов, у которых подписчиков
+больше TIMELINE_FANOUT_LIMIT, не раскладываются по лентам, а
+добавляются к ленте при чтении (fan-out on read).
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import Follow, Post, TimelineEntry
+
+POPULAR_AUTHORS_KEY = 'timeline:popular_authors'
+POPULAR_AUTHORS_TIMEOUT = 60 * 10
+BATCH_SIZE = 500
+# Порядок ленты по колонкам TimelineEntry: страница читается по
+# индексу timeline_user_date_idx без сортировки всей ленты.
+ORDERING = ('-timeline_date', '-timeline_post')
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def popular_authors():
+    """Возвращает множество id авторов с большим числом подписчиков."""
+    authors = cache.get(POPULAR_AUTHORS_KEY)
+    if authors is None:
+        authors = set(
+            Follow.objects.values('author').order_by()
+            .annotate(followers=Count('pk'))
+            .filter(followers__gt=fanout_limit())
+            .values_list('author', flat=True))
+        cache.set(POPULAR_AUTHORS_KEY, authors, POPULAR_AUTHORS_TIMEOUT)
+    return authors
+
+
+def is_popular(author_id):
+    return (Follow.objects.filter(author_id=author_id).count()
+            > fanout_limit())
+
+
+def _bulk_add(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def fan_out(post):
+    """Добавляет пост в ленты подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Переносит посты автора в ленту подписчика."""
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('pk', 'pub_date')
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def follow(user_id, author_id):
+    """Обновляет ленты после подписки user на author."""
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers > fanout_limit():
+        if followers == fanout_limit() + 1:
+            cache.delete(POPULAR_AUTHORS_KEY)
+        return
+    backfill(user_id, author_id)
+
+
+def unfollow(user_id, author_id):
+    """Обновляет ленты после отписки user от author."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+    followers = Follow.objects.filter(author_id=author_id)
+    if followers.count() == fanout_limit():
+        # Автор перестал быть популярным: его посты снова
+        # раскладываются по лентам, поэтому ленты нужно дополнить.
+        cache.delete(POPULAR_AUTHORS_KEY)
+        for follower_id in followers.values_list('user_id', flat=True):
+            backfill(follower_id, author_id)
+
+
+def rebuild(author_ids):
+    """Дополняет ленты подписчиков авторов author_ids их постами.
+
+    Нужна после массовой загрузки постов и подписок в обход сигналов.
+    Записи каждого автора добавляются одним INSERT ... SELECT.
+    """
+    cache.delete(POPULAR_AUTHORS_KEY)
+    popular = popular_authors()
+    sql = (
+        f'INSERT INTO {TimelineEntry._meta.db_table} '
+        f'(user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        f'WHERE f.author_id = %s AND NOT EXISTS ('
+        f'SELECT 1 FROM {TimelineEntry._meta.db_table} t '
+        f'WHERE t.user_id = f.user_id AND t.post_id = p.id)'
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for author_id in author_ids:
+            if author_id not in popular:
+                cursor.execute(sql, [author_id])
+
+
+def follow_posts(user):
+    """Возвращает посты ленты подписок пользователя.
+
+    Если в ленте нет популярных авторов, посты упорядочены по дате и
+    посту записей TimelineEntry (ORDERING), и курсоры страниц
+    указывают на записи ленты. Иначе к ленте добавляются посты
+    популярных авторов, и порядок задает пагинатор.
+    """
+    popular = popular_authors()
+    if popular:
+        popular = popular & set(
+            user.follower.values_list('author', flat=True))
+    if not popular:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            timeline_date=F('timeline_entries__pub_date'),
+            timeline_post=F('timeline_entries__post'),
+        ).order_by(*ORDERING)
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=popular))
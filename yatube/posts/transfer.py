@@ -0,0 +1,302 @@
+"""Массовая выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Данные пишутся и читаются потоком в NDJSON (объект JSON на строку)
+или CSV с заголовком. Выгрузка читает таблицу по pk через
+.iterator(), загрузка создает строки bulk_create пачками по
+batch_size, каждая пачка - в своей транзакции. После каждой пачки в
+файл контрольной точки записывается, докуда дошла работа, и
+повторный запуск с тем же файлом продолжает с этого места.
+
+Пользователи указываются по username; отсутствующие при загрузке
+создаются без пароля. bulk_create не вызывает сигналы, поэтому
+загрузка сама обновляет индекс поиска и версии лент, а в конце
+сверяет счетчики (stats.reconcile), сбрасывает счетчики лент и
+дополняет ленты подписок.
+"""
+import csv
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import counters, feed_cache, search, stats, timeline
+from .models import Comment, FeedCounter, Follow, Group, Post
+
+User = get_user_model()
+
+FORMATS = ('ndjson', 'csv')
+BATCH_SIZE = 2000
+
+"""Описание выгружаемой модели: колонки файла, выражения values_list
+для них, поля модели для загрузки и колонки с username."""
+Spec = namedtuple(
+    'Spec', ['model', 'columns', 'lookups', 'fields', 'users'])
+
+SPECS = {
+    'groups': Spec(
+        Group,
+        ('id', 'title', 'slug', 'description'),
+        ('pk', 'title', 'slug', 'description'),
+        ('id', 'title', 'slug', 'description'),
+        ()),
+    'posts': Spec(
+        Post,
+        ('id', 'pub_date', 'text', 'author', 'group', 'image'),
+        ('pk', 'pub_date', 'text', 'author__username', 'group_id', 'image'),
+        ('id', 'pub_date', 'text', 'author_id', 'group_id', 'image'),
+        ('author',)),
+    'comments': Spec(
+        Comment,
+        ('id', 'pub_date', 'text', 'author', 'post'),
+        ('pk', 'pub_date', 'text', 'author__username', 'post_id'),
+        ('id', 'pub_date', 'text', 'author_id', 'post_id'),
+        ('author',)),
+    'follows': Spec(
+        Follow,
+        ('id', 'user', 'author'),
+        ('pk', 'user__username', 'author__username'),
+        ('id', 'user_id', 'author_id'),
+        ('user', 'author')),
+}
+
+
+def read_checkpoint(path):
+    """Значение контрольной точки path или 0, если ее еще нет."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        return int(checkpoint.read().strip() or 0)
+
+
+def write_checkpoint(path, value):
+    if not path:
+        return
+    with open(f'{path}.tmp', 'w') as checkpoint:
+        checkpoint.write(str(value))
+    os.replace(f'{path}.tmp', path)
+
+
+def _serialize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _writer(stream, fmt, columns, header):
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        if header:
+            writer.writerow(columns)
+        return lambda row: writer.writerow(
+            '' if value is None else _serialize(value) for value in row)
+    return lambda row: stream.write(json.dumps(
+        dict(zip(columns, map(_serialize, row))),
+        ensure_ascii=False) + '\n')
+
+
+def export(name, stream, fmt='ndjson', after=0, checkpoint=None,
+           batch_size=BATCH_SIZE, header=None):
+    """Выгружает в stream строки модели name с pk больше after.
+
+    Заголовок CSV пишется, если header истинно; по умолчанию - если
+    выгрузка не продолжается с контрольной точки.
+    Возвращает количество выгруженных строк.
+    """
+    spec = SPECS[name]
+    resume = read_checkpoint(checkpoint)
+    if header is None:
+        header = not resume
+    after = max(after, resume)
+    rows = (spec.model.objects.filter(pk__gt=after).order_by('pk')
+            .values_list(*spec.lookups).iterator(chunk_size=batch_size))
+    write = _writer(stream, fmt, spec.columns, header=header)
+    exported = 0
+    for exported, row in enumerate(rows, start=1):
+        write(row)
+        if exported % batch_size == 0:
+            stream.flush()
+            write_checkpoint(checkpoint, row[0])
+    stream.flush()
+    if exported:
+        write_checkpoint(checkpoint, row[0])
+    return exported
+
+
+def _reader(stream, fmt):
+    if fmt == 'csv':
+        return csv.DictReader(stream)
+    return (json.loads(line) for line in stream if line.strip())
+
+
+def _user_ids(usernames):
+    """id пользователей по username; недостающие создаются."""
+    ids = dict(User.objects.filter(username__in=usernames)
+               .values_list('username', 'pk'))
+    missing = set(usernames) - ids.keys()
+    if missing:
+        User.objects.bulk_create(
+            (User(username=username, password=make_password(None))
+             for username in missing),
+            ignore_conflicts=True)
+        ids.update(User.objects.filter(username__in=missing)
+                   .values_list('username', 'pk'))
+    return ids
+
+
+def _to_python(model, attname, value):
+    field = model._meta.get_field(attname)
+    if value in ('', None) and field.null:
+        return None
+    return field.to_python(value)
+
+
+def _build(spec, rows):
+    usernames = {row[column] for row in rows for column in spec.users}
+    user_ids = _user_ids(usernames) if usernames else {}
+    objects = []
+    for row in rows:
+        values = {}
+        for column, attname in zip(spec.columns, spec.fields):
+            value = row.get(column)
+            if column in spec.users:
+                value = user_ids[value]
+            values[attname] = _to_python(spec.model, attname, value)
+        objects.append(spec.model(**values))
+    return objects
+
+
+@contextmanager
+def _keep_dates(model):
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты
+    из файла."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Loader:
+    """Обновляет данные, которые сигналы обновили бы для каждой
+    строки: after_batch - после пачки (получает только вставленные
+    объекты), finish - после загрузки."""
+
+    def __init__(self):
+        self.authors = set()
+
+    def after_batch(self, objects):
+        pass
+
+    def finish(self):
+        pass
+
+
+class GroupLoader(Loader):
+    def after_batch(self, objects):
+        feed_cache.bump(
+            feed_cache.GROUPS,
+            *(counters.group_key(group.pk) for group in objects))
+
+
+class PostLoader(Loader):
+    def after_batch(self, objects):
+        search.get_backend().index_many(objects)
+        feeds = set()
+        for post in objects:
+            self.authors.add(post.author_id)
+            feeds.add(feed_cache.post(post.pk))
+            feeds.update(counters.post_keys(post.group_id, post.author_id))
+        feed_cache.bump(*feeds)
+
+    def finish(self):
+        FeedCounter.objects.all().delete()
+        stats.reconcile()
+        timeline.rebuild(self.authors)
+
+
+class CommentLoader(Loader):
+    def after_batch(self, objects):
+        feed_cache.bump(*{feed_cache.post(c.post_id) for c in objects})
+
+    def finish(self):
+        stats.reconcile()
+        feed_cache.bump(counters.INDEX_KEY)
+
+
+class FollowLoader(Loader):
+    def after_batch(self, objects):
+        self.authors.update(follow.author_id for follow in objects)
+        feed_cache.bump(*{feed_cache.follow(f.user_id) for f in objects})
+
+    def finish(self):
+        stats.reconcile()
+        timeline.rebuild(self.authors)
+
+
+def _reset_sequence(model):
+    """Сдвигает последовательность pk за загруженные строки (в
+    PostgreSQL и Oracle; в SQLite и MySQL не нужно)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+LOADERS = {
+    'groups': GroupLoader,
+    'posts': PostLoader,
+    'comments': CommentLoader,
+    'follows': FollowLoader,
+}
+
+
+def load(name, stream, fmt='ndjson', checkpoint=None,
+         batch_size=BATCH_SIZE):
+    """Загружает строки модели name из stream.
+
+    Строки с уже занятыми pk пропускаются, поэтому пачку, прерванную
+    между фиксацией и записью контрольной точки, можно загрузить
+    повторно. Возвращает количество прочитанных строк.
+    """
+    return load_rows(name, _reader(stream, fmt), checkpoint, batch_size)
+
+
+def load_rows(name, rows, checkpoint=None, batch_size=BATCH_SIZE):
+    """Загружает строки модели name из итератора словарей rows
+    с колонками SPECS[name].columns."""
+    spec = SPECS[name]
+    loader = LOADERS[name]()
+    done = read_checkpoint(checkpoint)
+    rows = islice(rows, done, None)
+    with _keep_dates(spec.model):
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            objects = _build(spec, batch)
+            # Строки с занятыми pk bulk_create пропустит: сигналов
+            # для них не было, значит, и after_batch их не касается.
+            existing = set(spec.model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', flat=True))
+            inserted = [obj for obj in objects if obj.pk not in existing]
+            # Размер INSERT bulk_create выбирает сам: в Django 2.2
+            # переданный batch_size не ограничивается лимитами SQLite.
+            with transaction.atomic():
+                spec.model.objects.bulk_create(objects, ignore_conflicts=True)
+                loader.after_batch(inserted)
+            done += len(batch)
+            write_checkpoint(checkpoint, done)
+    _reset_sequence(spec.model)
+    loader.finish()
+    return done
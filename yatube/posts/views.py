@@ -1,35 +1,49 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, redirect
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from .forms import PostForm, CommentForm
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.core.paginator import Paginator
 
-
+from core.db import read_from_replica
+from core.paginators import CursorPaginator, get_page
+from . import counters, feed_cache, feeds, search, stats, thumbnails
+from .http_cache import (
+    cache_headers, group_last_modified, index_last_modified,
+    post_last_modified, profile_last_modified)
 from .models import Post, Group, User, Follow
 """Количество объектов модели."""
 COUNT_OBJECT = 10
+"""Количество комментариев на странице."""
+COMMENTS_PER_PAGE = 20
 
 
+@read_from_replica
+@cache_headers(index_last_modified)
 def index(request):
     """View-функция возвращает главную страницу.
 
     Ключевые аргументы:
     posts_list -- объекты модели Post,
-    paginator -- количество записей на странице,
-    page_number -- номер запрошенной страницы,
     page_obj -- набор записей для страницы с запрошенным номером
+    или курсором
     """
-    posts_list = Post.objects.all()
-    paginator = Paginator(posts_list, COUNT_OBJECT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = feeds.index_feed()
+    count = feed_cache.memoize(
+        'count', [counters.INDEX_KEY], counters.index_count)
+    page_obj = thumbnails.attach_to_page(
+        get_page(request, posts_list, COUNT_OBJECT, count=count))
     context = {
         'page_obj': page_obj,
+        **feed_cache.cache_context(page_obj, counters.INDEX_KEY),
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@cache_headers(group_last_modified)
 def group_posts(request, slug):
     """ View-функция возвращает страницу сообщества.
 
@@ -41,36 +55,43 @@ def group_posts(request, slug):
     """
 
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    paginator = Paginator(posts_list, COUNT_OBJECT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = feeds.group_feed(group)
+    count = feed_cache.memoize(
+        'count', [counters.group_key(group.pk)],
+        counters.group_count, group)
+    page_obj = thumbnails.attach_to_page(
+        get_page(request, posts_list, COUNT_OBJECT, count=count))
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache.cache_context(
+            page_obj, counters.group_key(group.pk)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@cache_headers(profile_last_modified)
 def profile(request, username):
     """ View-функция возвращает страницу профайла пользователя.
 
     Ключевые аргументы:
     user -- объект класса User, username=username,
     posts -- все посты объекта user,
-    paginator -- количество записей на странице,
-    page_number -- номер запрошенной страницы,
+    author_stats -- статистика автора,
     page_obj -- набор записей для страницы с запрошенным номером
+    или курсором
     """
     user_profile = get_object_or_404(User, username=username)
-    posts = user_profile.posts.all()
-    paginator = Paginator(posts, COUNT_OBJECT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = feeds.profile_feed(user_profile)
+    author_stats = stats.get(user_profile.pk)
+    page_obj = thumbnails.attach_to_page(
+        get_page(request, posts, COUNT_OBJECT, count=author_stats.posts))
     title = 'Страница пользователя'
     fullname = user_profile.get_full_name()
     user = request.user
-    following = user.is_authenticated and user_profile.following.exists()
+    following = user.is_authenticated and Follow.objects.filter(
+        user=user, author=user_profile).exists()
     context = {
         'author': user_profile,
         'posts': posts,
@@ -78,31 +99,102 @@ def profile(request, username):
         'title': title,
         'fullname': fullname,
         'following': following,
+        'author_stats': author_stats,
+        **feed_cache.cache_context(
+            page_obj, counters.author_key(user_profile.pk)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+@cache_headers(post_last_modified)
 def post_detail(request, post_id):
     """ View-функция возвращает страницу поста.
 
     Ключевые аргументы:
     post -- объект модели Post, id=post_id,
-    posts -- все объекты модели Post,
-    comments -- все комментарии объекта post с id=post_id,
+    author_stats -- статистика автора поста,
+    comments -- первая страница комментариев объекта post с id=post_id,
     form -- объект класса CommentForm
     """
-    post = get_object_or_404(Post, id=post_id)
-    posts = Post.objects.all()
-    comments = post.comments.all()
+    post = feed_cache.memoize(
+        'post', [feed_cache.post(post_id)], get_object_or_404,
+        feeds.feed(Post.objects), id=post_id)()
+    comments = get_comments_page(request, post.pk)
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
-        'posts': posts,
+        'author_stats': stats.get(post.author_id),
         'form': form,
         'comments': comments}
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_page(request, post_id):
+    """Возвращает страницу комментариев поста по курсору ?after=."""
+    paginator = CursorPaginator(
+        feeds.comment_feed(post_id), COMMENTS_PER_PAGE,
+        ordering=('pub_date', 'pk'))
+    after = request.GET.get('after')
+    if after:
+        return paginator.get_cursor_page(after=after)
+    return paginator.get_first_page()
+
+
+def post_comments(request, post_id):
+    """ View-функция возвращает страницу комментариев поста
+    в JSON или, при ?format=html, HTML-фрагментом.
+
+    Ключевые аргументы:
+    comments -- страница комментариев после курсора ?after=
+    """
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(request, post_id)
+    if request.GET.get('format') == 'html':
+        return render(request, 'posts/includes/comments.html', {
+            'post_id': post_id,
+            'comments': comments,
+        })
+    next_url = None
+    if comments.has_next():
+        next_url = '{}?after={}'.format(
+            reverse('posts:post_comments', args=[post_id]),
+            comments.next_cursor)
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'author_url': reverse(
+                    'posts:profile', args=[comment.author.username]),
+                'text': comment.text,
+                'pub_date': comment.pub_date.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': next_url,
+    })
+
+
+def post_search(request):
+    """ View-функция возвращает страницу поиска по постам.
+
+    Ключевые аргументы:
+    query -- строка запроса из параметра q,
+    page_obj -- найденные посты в порядке релевантности
+    для страницы с запрошенным номером
+    """
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search.search(query), COUNT_OBJECT)
+    page_obj = thumbnails.attach_to_page(
+        paginator.get_page(request.GET.get('page')))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     """ View-функция создает пост и возвращает страницу профайла пользоваетеля.
@@ -118,7 +210,10 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            # Счетчики обновляются сигналами в той же транзакции.
+            with transaction.atomic():
+                post.save()
+            thumbnails.schedule(post.image)
             username = post.author
             return redirect('posts:profile', username=username)
     return render(request, 'posts/create_post.html', {'form': form})
@@ -146,9 +241,9 @@ def post_edit(request, post_id):
         return post_detail(request, post_id)
     else:
         if request.method == "POST":
-            form = PostForm(request.POST, instance=post)
             if form.is_valid():
                 post = form.save()
+                thumbnails.schedule(post.image)
                 return redirect('posts:post_detail', post_id=post.id)
         return render(request, template, context)
 
@@ -167,33 +262,35 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
     """View-функция возвращает страницу
     с избранными авторами.
 
     Ключевые аргументы:
     user -- текущий пользователь,
-    authors -- список объектов класса User,
-    на которых подписан текущий пользователь
     posts_list -- объекты модели Post, отфильтрованные по
     авторам, на которых подписан текущий пользователь
-    paginator -- количество записей на странице,
-    page_number -- номер запрошенной страницы,
     page_obj -- набор записей для страницы с запрошенным номером
+    или курсором
     """
     user = request.user
-    authors = user.follower.values_list('author', flat=True)
-    posts_list = Post.objects.filter(author__id__in=authors)
-    paginator = Paginator(posts_list, COUNT_OBJECT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = feeds.follow_feed(user)
+    count = feed_cache.memoize(
+        'count', [feed_cache.follow(user.pk), counters.INDEX_KEY],
+        counters.follow_count, user)
+    page_obj = thumbnails.attach_to_page(
+        get_page(request, posts_list, COUNT_OBJECT, count=count))
     context = {
         'page_obj': page_obj,
+        **feed_cache.cache_context(
+            page_obj, feed_cache.follow(user.pk), counters.INDEX_KEY),
     }
     return render(request, 'posts/follow.html', context)
 
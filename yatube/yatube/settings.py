@@ -23,7 +23,7 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 SECRET_KEY = 'kxl$7x)yvg%23uq-20$au1(dihypfb5xdbsq=-fj_4!95v%%e2'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('YATUBE_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -56,12 +56,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'about.apps.AboutConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryInspectionMiddleware',
+    'core.middleware.StickyPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,13 +75,19 @@ MIDDLEWARE = [
 
 INTERNAL_IPS = [
     '127.0.0.1',
-] 
+]
+
+# Debug toolbar подключается только в режиме отладки: на рабочем
+# сервере он не нужен и замедляет каждый запрос.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -96,17 +104,52 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.testing.DiscoverRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Подключения живут CONN_MAX_AGE секунд и переиспользуются запросами
+# одного потока. timeout - сколько секунд SQLite ждет освобождения
+# блокировки записи, прежде чем вернуть "database is locked".
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.getenv(
+            'YATUBE_DATABASE', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_CONN_MAX_AGE', 60)),
+        'OPTIONS': {'timeout': 20},
     }
 }
 
+# PRAGMA каждого нового подключения к SQLite (core.db.tune_sqlite).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики только для чтения: пути к копиям базы через запятую в
+# YATUBE_REPLICAS. Из них читают страницы лент и постов
+# (core.db.read_from_replica); без реплик все идет в default.
+REPLICA_DATABASES = []
+for number, name in enumerate(
+        filter(None, os.getenv('YATUBE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+# Наибольшее отставание реплик в секундах: столько после записи
+# пользователь читает из основной базы, а страницы, прочитанные с
+# реплик, не кешируются под новой версией ленты.
+REPLICA_PIN_SECONDS = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -150,8 +193,75 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Авторы, у которых подписчиков больше этого числа, не раскладывают
+# посты по лентам подписок, а добавляются к ним при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Время жизни кеша страниц лент. Кеш сбрасывается сменой версии ленты
+# при изменении постов, комментариев и подписок.
+FEED_CACHE_TIMEOUT = 60 * 60 * 4
+
+# max-age страниц лент и постов для анонимных пользователей.
+HTTP_CACHE_MAX_AGE = 60
+
+# Токен доступа к /metrics/ (заголовок Authorization: Bearer <токен>).
+# Без токена метрики доступны только сотрудникам (is_staff).
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
+
+# Поиск N+1 и медленных запросов (core.queries). QUERY_INSPECTION
+# включает запись в лог для каждого запроса к сайту.
+QUERY_INSPECTION = os.getenv('YATUBE_QUERY_INSPECTION', '0') == '1'
+QUERY_REPEAT_THRESHOLD = 5
+SLOW_QUERY_TIME = 0.1
+
+# Наибольшее число SQL-запросов страницы авторизованного пользователя
+# при пустом кеше в памяти процесса. Проверяется тестами и
+# QUERY_INSPECTION; кеш в базе добавляет к странице свои запросы.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:allrecord': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_comments': 2,
+    'posts:post_search': 5,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:follow_index': 4,
+}
+
+# Бэкенд полнотекстового поиска по постам: posts.search.SQLiteFTSBackend
+# (индекс FTS5, создается миграцией) или posts.search.SimpleBackend
+# (LIKE без индекса, для баз без FTS5).
+SEARCH_BACKEND = os.getenv(
+    'YATUBE_SEARCH_BACKEND', 'posts.search.SQLiteFTSBackend')
+
+# Число потоков, создающих миниатюры картинок постов в фоне.
+# 0 - миниатюры создаются сразу после фиксации транзакции; так они
+# создаются в тестах (core.testing.TEST_SETTINGS).
+THUMBNAIL_WORKERS = int(os.getenv('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Бэкенд кеша выбирается переменной окружения YATUBE_CACHE_BACKEND:
+# locmem - кеш в памяти процесса (по умолчанию),
+# file - общий для всех воркеров кеш в каталоге YATUBE_CACHE_LOCATION,
+# db - общий кеш в таблице YATUBE_CACHE_LOCATION
+# (создается командой `python manage.py createcachetable`).
+CACHE_BACKENDS = {
+    'locmem': ('core.cache.CountingLocMemCache', ''),
+    'file': ('core.cache.CountingFileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'db': ('core.cache.CountingDatabaseCache', 'yatube_cache'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('YATUBE_CACHE_BACKEND', 'locmem')]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': os.getenv('YATUBE_CACHE_KEY_PREFIX', 'yatube'),
+        'KEY_FUNCTION': 'core.cache.make_key',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('YATUBE_CACHE_MAX_ENTRIES', 10000)),
+        },
     }
 }